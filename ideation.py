@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Ollama Ideation CLI - run ideation batches without the GUI
+
+Progress is written to stdout as JSON lines, one object per status update,
+and log messages go to stderr. PyQt6 is never imported.
+
+    python ideation.py run --prompt-file prompt.txt --count 1000 --out ideas/
+    python ideation.py retry --out ideas/
+    python ideation.py export --out ideas/ --to ideas_md/
+    python ideation.py embed --out ideas/ && python ideation.py cluster --out ideas/
+"""
+import sys
+import os
+import json
+import argparse
+import threading
+
+from ideation_engine import (
+    OLLAMA_HOST, DEFAULT_MODEL, DEFAULT_CONCURRENCY, DEFAULT_KEEP_ALIVE, MULTI_FORMATS, JOURNAL_FILENAME, OUTPUT_LAYOUTS, DUPLICATE_POLICIES,
+    ConnectionSettings,
+    IdeationEngine, JobJournal, create_client, export_markdown, load_dead_letters, parse_hosts,
+)
+from ideation_store import OUTPUT_FORMATS, find_stores
+from ideation_sampling import SAMPLING_PARAMETERS, SWEEP_STRATEGIES
+from ideation_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB
+from ideation_dedup import NEAR_DUPLICATE_POLICIES, DEFAULT_SIMILARITY_THRESHOLD
+from ideation_embed import (
+    DEFAULT_EMBED_MODEL, DEFAULT_SEMANTIC_THRESHOLD, CLUSTERS_FILENAME, SEMANTIC_DUPLICATES_FILENAME,
+    EmbeddingIndex, backfill, cluster_folder,
+)
+
+# Seconds between progress lines on stdout
+DEFAULT_PROGRESS_INTERVAL = 1.0
+LAYOUT_HELP = "put .md files in the output folder (flat, default) or in hash-prefix / per-day subfolders"
+# Fields of the "finished" event and the engine attributes they report
+FINISHED_COUNTS = {
+    "completed": "completed",
+    "batch_size": "batch_size",
+    "saved": "saved",
+    "failed": "failed",
+    "duplicates": "duplicates_found",
+    "near_duplicates": "near_duplicates_found",
+    "cache_hits": "cache_hits",
+}
+
+
+def emit(event, **fields):
+    """Write one machine-readable progress line"""
+    sys.stdout.write(json.dumps(dict(event=event, **fields)) + "\n")
+    sys.stdout.flush()
+
+
+def read_prompt(args):
+    """Get the prompt from --prompt or --prompt-file ('-' reads stdin)"""
+    if args.prompt is not None:
+        return args.prompt.strip()
+    if args.prompt_file == "-":
+        return sys.stdin.read().strip()
+    with open(args.prompt_file) as f:
+        return f.read().strip()
+
+
+def make_status_handler(args):
+    """Build the engine's on_status callback for this invocation"""
+    def on_status(update):
+        if not args.quiet:
+            for message, error in update["log"]:
+                prefix = "ERROR: " if error else ""
+                sys.stderr.write(f"{prefix}{message.strip()}\n")
+        emit(
+            "status",
+            completed=update["completed"],
+            batch_size=update["batch_size"],
+            saved=update["saved"],
+            failed=update["failed"],
+            duplicates=update["duplicates"],
+            near_duplicates=update["near_duplicates"],
+            cold_loads=update["cold_loads"],
+            load_seconds=round(update["load_seconds"], 2),
+            cache_hits=update["cache_hits"],
+            limit=update["limit"],
+            ideas_per_minute=round(update["ideas_per_minute"], 2),
+            files=update["saved_files"],
+        )
+    return on_status
+
+
+def run_engine(engine):
+    """Run the engine on a thread so Ctrl+C can stop it cleanly.
+
+    The first interrupt cancels in-flight requests and lets queued ideas
+    be saved; a second one exits immediately.
+    """
+    done = threading.Event()
+
+    def target():
+        try:
+            engine.run()
+        finally:
+            done.set()
+
+    # Wait on an event rather than join(): an interrupted join can leave
+    # is_alive() reporting False while the thread is still running
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    stopped = False
+    while not done.is_set():
+        try:
+            done.wait(0.2)
+        except KeyboardInterrupt:
+            if stopped:
+                raise
+            stopped = True
+            sys.stderr.write("Stopping; press Ctrl+C again to quit immediately\n")
+            engine.stop()
+    return stopped
+
+
+def build_engine(args, prompt, batch_size, retry_entries=None, resume_run=None):
+    connection_settings = ConnectionSettings(read_timeout=args.timeout or None)
+    return IdeationEngine(
+        prompt, batch_size, args.out, args.concurrency,
+        connection_settings=connection_settings, stream=args.stream,
+        retry_entries=retry_entries, hosts=parse_hosts(",".join(args.host)),
+        resume_run=resume_run, sync_writes=args.sync, model=args.model,
+        on_status=make_status_handler(args), status_interval=args.progress_interval,
+        output_format=args.format, layout=args.layout, duplicates=args.duplicates,
+        near_duplicates=args.near_duplicates, similarity_threshold=args.similarity,
+        embed_model=args.embed_model, keep_alive=args.keep_alive, preload=args.preload,
+        ideas_per_request=args.ideas_per_request, multi_format=args.multi_format,
+        structured=args.structured, seed=args.seed,
+        sampling={name: getattr(args, name) for name in SAMPLING_PARAMETERS}, sweep=args.sweep,
+        cache=args.cache,
+        cache_dir=args.cache_dir, cache_size_mb=args.cache_size,
+    )
+
+
+def finish(engine, stopped):
+    """Report the final counts and pick the exit code"""
+    counts = {field: getattr(engine, attribute) for field, attribute in FINISHED_COUNTS.items()}
+    emit("finished", **counts, stopped=stopped)
+    if stopped:
+        return 130
+    return 1 if engine.failed else 0
+
+
+def cmd_run(args):
+    prompt = read_prompt(args)
+    if not prompt:
+        sys.stderr.write("Error: the prompt is empty\n")
+        return 2
+
+    resume_run = None
+    if args.resume and os.path.isdir(args.out):
+        job = JobJournal(args.out).load().find_resumable(prompt, args.count, args.model)
+        if job:
+            resume_run = job["run"]
+            sys.stderr.write(f"Resuming unfinished batch {resume_run} from {JOURNAL_FILENAME}\n")
+
+    engine = build_engine(args, prompt, args.count, resume_run=resume_run)
+    emit("started", run=engine.run_id, batch_size=engine.batch_size, model=engine.model,
+         hosts=[host.url for host in engine.host_pool.hosts], output_folder=args.out)
+    stopped = run_engine(engine)
+    return finish(engine, stopped)
+
+
+def cmd_retry(args):
+    entries = list(load_dead_letters(args.out).values()) if os.path.isdir(args.out) else []
+    if not entries:
+        sys.stderr.write(f"No failed ideas recorded in {args.out}\n")
+        emit("finished", **dict.fromkeys(FINISHED_COUNTS, 0), stopped=False)
+        return 0
+
+    engine = build_engine(args, None, len(entries), retry_entries=entries)
+    emit("started", run=engine.run_id, batch_size=engine.batch_size, model=engine.model,
+         hosts=[host.url for host in engine.host_pool.hosts], output_folder=args.out)
+    stopped = run_engine(engine)
+    return finish(engine, stopped)
+
+
+def cmd_export(args):
+    if args.store:
+        sources = [args.store]
+    else:
+        sources = [path for output_format, path in find_stores(args.out)]
+    if not sources:
+        sys.stderr.write(f"No packed ideas store found in {args.out}\n")
+        return 1
+    for source in sources:
+        count = export_markdown(source, args.to, args.layout)
+        sys.stderr.write(f"Exported {count} ideas from {source} to {args.to}\n")
+        emit("exported", source=source, destination=args.to, count=count)
+    return 0
+
+
+def cmd_embed(args):
+    host = parse_hosts(",".join(args.host))[0]
+    index = EmbeddingIndex(args.out, args.embed_model).load()
+    try:
+        with create_client(ConnectionSettings()) as client:
+            count = backfill(index, client, host, args.out, log=lambda message: sys.stderr.write(message + "\n"))
+    finally:
+        index.close()
+    emit("embedded", count=count, total=len(index.names), model=args.embed_model)
+    return 0
+
+
+def cmd_cluster(args):
+    clusters, duplicates = cluster_folder(args.out, args.embed_model, args.clusters, args.threshold)
+    sys.stderr.write(
+        f"Wrote {clusters} clusters to {CLUSTERS_FILENAME} and {duplicates} semantic duplicates "
+        f"to {SEMANTIC_DUPLICATES_FILENAME}\n"
+    )
+    emit("clustered", clusters=clusters, semantic_duplicates=duplicates)
+    return 0
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--out", required=True, help="output folder for the ideas")
+    parser.add_argument("--host", action="append", default=[],
+                        help=f"Ollama host, repeat or comma-separate for several (default {OLLAMA_HOST})")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"model to use (default {DEFAULT_MODEL})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="requests in flight per host (match OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE,
+                        help=f"keep the model loaded this long between requests during the batch, "
+                             f"e.g. 30m, 2h or -1 for forever (default {DEFAULT_KEEP_ALIVE})")
+    parser.add_argument("--ideas-per-request", type=int, default=1,
+                        help="ask for this many ideas in each request and split the response (default 1)")
+    parser.add_argument("--multi-format", choices=MULTI_FORMATS, default="delimited",
+                        help="how several ideas per request are separated (default delimited)")
+    parser.add_argument("--structured", action="store_true",
+                        help="have the model return JSON {title, body, tags} for reliable titles and tags")
+    parser.add_argument("--seed",
+                        help="make the batch reproducible: idea N is generated with seed SEED+N, "
+                             "or with seeds wrapping within START:END")
+    for name in SAMPLING_PARAMETERS:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, metavar="VALUE|LOW:HIGH[:STEPS]",
+                            help=f"Ollama {name}, or a range to sweep across the batch")
+    parser.add_argument("--sweep", choices=SWEEP_STRATEGIES, default="linear",
+                        help="spread ranges evenly over the batch (default), cycle through a grid of "
+                             "STEPS points per range, or draw them at random")
+    parser.add_argument("--cache", action="store_true",
+                        help="replay seeded responses from an on-disk cache instead of asking the model again")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"where the response cache lives (default {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f"MB of responses to keep before evicting the least recently used "
+                             f"(default {DEFAULT_CACHE_SIZE_MB})")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="don't load the model on every host before the batch starts")
+    parser.add_argument("--timeout", type=float, default=0,
+                        help="seconds to wait for a generation (0 waits indefinitely)")
+    parser.add_argument("--stream", action="store_true", help="stream tokens to disk as they arrive")
+    parser.add_argument("--sync", action="store_true", help="fsync ideas before publishing them")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="md",
+                        help="one .md file per idea (default) or a packed jsonl / jsonl.zst / sqlite store")
+    parser.add_argument("--layout", choices=OUTPUT_LAYOUTS, default="flat", help=LAYOUT_HELP)
+    parser.add_argument("--duplicates", choices=DUPLICATE_POLICIES, default="regenerate",
+                        help="what to do when an idea repeats one already saved in --out (default regenerate)")
+    parser.add_argument("--near-duplicates", choices=NEAR_DUPLICATE_POLICIES, default="off",
+                        help="flag or skip ideas that mostly reuse the wording of a saved one (default off)")
+    parser.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                        help=f"near-duplicate threshold, 0-1 (default {DEFAULT_SIMILARITY_THRESHOLD})")
+    parser.add_argument("--embed-model", help="also embed every saved idea with this model (needs numpy)")
+    parser.add_argument("--progress-interval", type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help="seconds between progress lines on stdout")
+    parser.add_argument("--quiet", action="store_true", help="don't write log messages to stderr")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(prog="ideation", description="Batch ideation with Ollama, no GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="generate a batch of ideas")
+    prompt_group = run_parser.add_mutually_exclusive_group(required=True)
+    prompt_group.add_argument("--prompt-file", help="file holding the ideation prompt ('-' for stdin)")
+    prompt_group.add_argument("--prompt", help="the ideation prompt itself")
+    run_parser.add_argument("--count", type=int, required=True, help="number of ideas to generate")
+    run_parser.add_argument("--no-resume", dest="resume", action="store_false",
+                            help="start a new batch even if an unfinished one matches")
+    add_common_arguments(run_parser)
+    run_parser.set_defaults(func=cmd_run)
+
+    retry_parser = commands.add_parser("retry", help="re-run the failed ideas of an output folder")
+    add_common_arguments(retry_parser)
+    retry_parser.set_defaults(func=cmd_retry)
+
+    export_parser = commands.add_parser("export", help="write a packed store out as .md files")
+    export_parser.add_argument("--out", required=True, help="output folder holding the store")
+    export_parser.add_argument("--store", help="store file to export (default: every store in --out)")
+    export_parser.add_argument("--to", required=True, help="folder for the .md files")
+    export_parser.add_argument("--layout", choices=OUTPUT_LAYOUTS, default="flat", help=LAYOUT_HELP)
+    export_parser.set_defaults(func=cmd_export)
+
+    embed_parser = commands.add_parser("embed", help="embed the ideas of a folder that have no embedding yet")
+    embed_parser.add_argument("--out", required=True, help="output folder holding the ideas")
+    embed_parser.add_argument("--host", action="append", default=[], help=f"Ollama host (default {OLLAMA_HOST})")
+    embed_parser.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL,
+                              help=f"embedding model (default {DEFAULT_EMBED_MODEL})")
+    embed_parser.set_defaults(func=cmd_embed)
+
+    cluster_parser = commands.add_parser("cluster", help="group embedded ideas into clusters.md")
+    cluster_parser.add_argument("--out", required=True, help="output folder holding the ideas")
+    cluster_parser.add_argument("--embed-model", default=DEFAULT_EMBED_MODEL,
+                                help=f"embedding model the ideas were embedded with (default {DEFAULT_EMBED_MODEL})")
+    cluster_parser.add_argument("--clusters", type=int, help="number of clusters (default sqrt(ideas / 2))")
+    cluster_parser.add_argument("--threshold", type=float, default=DEFAULT_SEMANTIC_THRESHOLD,
+                                help=f"cosine similarity for semantic duplicates (default {DEFAULT_SEMANTIC_THRESHOLD})")
+    cluster_parser.set_defaults(func=cmd_cluster)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (RuntimeError, OSError, ValueError) as e:
+        sys.stderr.write(f"Error: {e}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
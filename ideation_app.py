@@ -4,137 +4,208 @@ Ollama Ideation UI - A GUI for batch ideation using Ollama's API
 """
 import sys
 import os
-import json
 import threading
-import queue
-import time
-import re
-import requests
-from datetime import datetime
+import collections
+import httpx
+from dataclasses import replace
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QTextEdit, QPushButton, QComboBox, QFileDialog,
-    QSpinBox, QProgressBar, QGroupBox, QSplitter
+    QSpinBox, QDoubleSpinBox, QProgressBar, QGroupBox, QSplitter, QCheckBox, QPlainTextEdit
+)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QFont, QTextCursor, QTextCharFormat, QColor
+
+from ideation_engine import (
+    OLLAMA_HOST, TAGS_PATH, PS_PATH, DEFAULT_MODEL, DEFAULT_CONCURRENCY, DEFAULT_KEEP_ALIVE,
+    HEALTH_CHECK_TIMEOUT, MAX_IDEAS_PER_REQUEST, MULTI_FORMATS, DEAD_LETTER_FILENAME,
+    JOURNAL_FILENAME, OUTPUT_LAYOUTS, DUPLICATE_POLICIES, ConnectionSettings, IdeationEngine,
+    JobJournal, create_client, load_dead_letters, load_model_list, parse_hosts,
+)
+from ideation_store import OUTPUT_FORMATS
+from ideation_cache import DEFAULT_CACHE_DIR
+from ideation_sampling import SAMPLING_PARAMETERS, SWEEP_STRATEGIES
+from ideation_dedup import (
+    NEAR_DUPLICATE_POLICIES, NEAR_DUPLICATES_FILENAME, DEFAULT_SIMILARITY_THRESHOLD,
+)
+from ideation_embed import (
+    DEFAULT_EMBED_MODEL, CLUSTERS_FILENAME, SEMANTIC_DUPLICATES_FILENAME, cluster_folder,
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, pyqtSlot
-from PyQt6.QtGui import QFont, QTextCursor
 
 # Constants
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
-MODEL = "llama3.2:latest"
+# Background model discovery in the window
+DISCOVERY_INTERVAL = 15.0
+# Terminal log: lines kept on screen and how often queued lines are appended
+LOG_MAX_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+# Seconds between the worker's coalesced status updates to the window
+STATUS_INTERVAL = 0.1
+
 
 class OllamaIdeationWorker(QThread):
     """Worker thread for generating ideas using Ollama API"""
-    progress_updated = pyqtSignal(int)
-    output_received = pyqtSignal(str)
-    idea_generated = pyqtSignal(str, str)  # filename, content
+    # Coalesced progress, counters, log lines, saved filenames and preview,
+    # emitted every STATUS_INTERVAL seconds (see IdeationEngine._emit_status)
+    status_updated = pyqtSignal(dict)
     finished = pyqtSignal()
-    error_occurred = pyqtSignal(str)
 
-    def __init__(self, prompt_template, batch_size, output_folder):
+    def __init__(self, prompt_template, batch_size, output_folder, concurrency=DEFAULT_CONCURRENCY,
+                 connection_settings=None, stream=False, retry_entries=None, hosts=None,
+                 resume_run=None, sync_writes=False, model=DEFAULT_MODEL, **engine_options):
         super().__init__()
-        self.prompt_template = prompt_template
-        self.batch_size = batch_size
-        self.output_folder = output_folder
-        self.is_running = True
+        # engine_options are the remaining IdeationEngine settings (output
+        # format, layout, deduplication, ...)
+        self.engine = IdeationEngine(
+            prompt_template, batch_size, output_folder, concurrency,
+            connection_settings=connection_settings, stream=stream,
+            retry_entries=retry_entries, hosts=hosts, resume_run=resume_run,
+            sync_writes=sync_writes, model=model, on_status=self.status_updated.emit,
+            status_interval=STATUS_INTERVAL, **engine_options,
+        )
+        self.concurrency = self.engine.concurrency
+        self.model = self.engine.model
 
     def run(self):
         """Run the ideation process"""
-        try:
-            os.makedirs(self.output_folder, exist_ok=True)
-            
-            for i in range(self.batch_size):
-                if not self.is_running:
-                    break
-                
-                # Create the full prompt with system instructions
-                system_prompt = (
-                    "You are a creative ideation assistant. Generate unique and varied ideas. "
-                    "Avoid repetition and maximize variability between iterations. "
-                    "Your response should be in markdown format. "
-                    "The filename should be a concise summary of the idea (max 50 chars)."
-                )
-                
-                prompt = {
-                    "model": MODEL,
-                    "prompt": self.prompt_template,
-                    "system": system_prompt,
-                    "stream": False
-                }
-                
-                self.output_received.emit(f"Generating idea {i+1}/{self.batch_size}...\n")
-                
-                # Call Ollama API
-                try:
-                    response = requests.post(OLLAMA_API_URL, json=prompt)
-                    response.raise_for_status()
-                    result = response.json()
-                    idea_content = result.get("response", "")
-                    
-                    # Extract a filename from the idea content
-                    idea_title = self._extract_title(idea_content)
-                    sanitized_title = self._sanitize_filename(idea_title)
-                    
-                    # Save the idea to a file
-                    filename = f"{sanitized_title}.md"
-                    filepath = os.path.join(self.output_folder, filename)
-                    
-                    # Ensure filename is unique
-                    counter = 1
-                    while os.path.exists(filepath):
-                        filename = f"{sanitized_title}_{counter}.md"
-                        filepath = os.path.join(self.output_folder, filename)
-                        counter += 1
-                    
-                    with open(filepath, 'w') as f:
-                        f.write(idea_content)
-                    
-                    self.idea_generated.emit(filename, idea_content)
-                    self.output_received.emit(f"Saved idea to: {filepath}\n")
-                    
-                except requests.RequestException as e:
-                    self.error_occurred.emit(f"API Error: {str(e)}")
-                    time.sleep(2)  # Wait before retrying
-                
-                # Update progress
-                self.progress_updated.emit(int((i + 1) / self.batch_size * 100))
-                
-                # Small delay to prevent overwhelming the API
-                time.sleep(0.5)
-            
-            self.output_received.emit(f"\nCompleted generating {self.batch_size} ideas!\n")
-            self.finished.emit()
-            
-        except Exception as e:
-            self.error_occurred.emit(f"Error: {str(e)}")
-            self.finished.emit()
+        self.engine.run()
+        self.finished.emit()
+
+    def stop(self):
+        """Stop the ideation process without blocking; finished follows"""
+        self.engine.stop()
+
+
+class OllamaDiscoveryWorker(QThread):
+    """Background thread that polls Ollama hosts for health and models.
+
+    Every DISCOVERY_INTERVAL seconds (or right away after refresh()) each
+    host's /api/tags and /api/ps are fetched with short timeouts, and the
+    results are emitted as {host: {"reachable", "models", "loaded", "error"}}
+    so the window never talks to Ollama on the GUI thread.
+    """
+    status_updated = pyqtSignal(dict)
+
+    def __init__(self, hosts, connection_settings):
+        super().__init__()
+        self.hosts = list(hosts)
+        self.connection_settings = replace(
+            connection_settings,
+            connect_timeout=HEALTH_CHECK_TIMEOUT,
+            read_timeout=HEALTH_CHECK_TIMEOUT,
+        )
+        self.is_running = True
+        self._wake = threading.Event()
+
+    def set_hosts(self, hosts):
+        """Poll a new host list, starting immediately"""
+        self.hosts = list(hosts)
+        self.refresh()
+
+    def refresh(self):
+        self._wake.set()
 
     def stop(self):
-        """Stop the ideation process"""
         self.is_running = False
-        self.wait()
-
-    def _extract_title(self, content):
-        """Extract a title from the idea content"""
-        # Try to find a heading
-        heading_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-        if heading_match:
-            return heading_match.group(1).strip()[:50]
-        
-        # Otherwise take the first line
-        first_line = content.strip().split('\n')[0]
-        return first_line[:50]
-
-    def _sanitize_filename(self, filename):
-        """Sanitize the filename to be valid"""
-        # Remove invalid characters
-        sanitized = re.sub(r'[<>:"/\\|?*]', '', filename)
-        # Replace spaces with underscores
-        sanitized = sanitized.replace(' ', '_')
-        # Ensure it's not empty
-        if not sanitized:
-            sanitized = f"idea_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        return sanitized
+        self._wake.set()
+
+    def run(self):
+        with create_client(self.connection_settings) as client:
+            while self.is_running:
+                self._wake.clear()
+                status = {host: self._poll(client, host) for host in self.hosts}
+                if self.is_running:
+                    self.status_updated.emit(status)
+                self._wake.wait(DISCOVERY_INTERVAL)
+
+    def _poll(self, client, host):
+        try:
+            response = client.get(f"{host}{TAGS_PATH}")
+            response.raise_for_status()
+            models = [model["name"] for model in response.json().get("models", [])]
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            return {"reachable": False, "models": [], "loaded": [], "error": str(e)}
+
+        # Loaded models are informational; older servers have no /api/ps
+        try:
+            response = client.get(f"{host}{PS_PATH}")
+            response.raise_for_status()
+            loaded = [model["name"] for model in response.json().get("models", [])]
+        except (httpx.HTTPError, ValueError, KeyError):
+            loaded = []
+        return {"reachable": True, "models": models, "loaded": loaded, "error": None}
+
+
+class ClusterWorker(QThread):
+    """Cluster a folder's embedded ideas off the GUI thread (see cluster_folder)"""
+    clustered = pyqtSignal(int, int)  # clusters, semantic duplicates
+    failed = pyqtSignal(str)
+
+    def __init__(self, output_folder, model):
+        super().__init__()
+        self.output_folder = output_folder
+        self.model = model
+
+    def run(self):
+        try:
+            clusters, duplicates = cluster_folder(self.output_folder, self.model)
+        except (RuntimeError, OSError, ValueError) as e:
+            self.failed.emit(str(e))
+            return
+        self.clustered.emit(clusters, duplicates)
+
+
+class LogView(QPlainTextEdit):
+    """Read-only terminal log with a bounded, batched append path.
+
+    Messages are queued and appended together on a timer inside a single
+    edit block, and the document drops its oldest lines past LOG_MAX_LINES,
+    so the cost of logging stays flat however long a batch runs.
+    """
+    ERROR_COLOR = "#ff6b6b"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(LOG_MAX_LINES)
+        # Lines that would scroll straight off the top are never rendered
+        self.pending = collections.deque(maxlen=LOG_MAX_LINES)
+
+        self.error_format = QTextCharFormat()
+        self.error_format.setForeground(QColor(self.ERROR_COLOR))
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start()
+
+    def log(self, message, error=False):
+        """Queue a message; it appears on the next flush"""
+        for line in message.rstrip('\n').split('\n'):
+            self.pending.append((line, error))
+
+    def flush(self):
+        """Append all queued lines in one edit"""
+        if not self.pending:
+            return
+        scrollbar = self.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        default_format = QTextCharFormat()
+        first = self.document().isEmpty()
+        while self.pending:
+            line, error = self.pending.popleft()
+            if not first:
+                cursor.insertBlock()
+            first = False
+            cursor.insertText(line, self.error_format if error else default_format)
+        cursor.endEditBlock()
+
+        # Only follow the output if the user hasn't scrolled up to read
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
 
 
 class MainWindow(QMainWindow):
@@ -144,8 +215,18 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Ollama Ideation UI")
         self.resize(800, 600)
         self.worker = None
+        self.cluster_worker = None
+        self.connection_settings = ConnectionSettings()
+        # Latest health/model discovery results, keyed by host
+        self.host_status = {}
         
         self.init_ui()
+
+        self.discovery = OllamaDiscoveryWorker(
+            parse_hosts(self.hosts_input.text()), self.connection_settings
+        )
+        self.discovery.status_updated.connect(self.on_host_status)
+        self.discovery.start()
         
     def init_ui(self):
         """Initialize the UI components"""
@@ -190,6 +271,49 @@ class MainWindow(QMainWindow):
         batch_layout.addWidget(batch_label)
         batch_layout.addWidget(self.batch_combo)
         batch_layout.addWidget(self.custom_batch)
+
+        concurrency_label = QLabel("Concurrent Requests:")
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 64)
+        self.concurrency_spin.setValue(DEFAULT_CONCURRENCY)
+        self.concurrency_spin.setToolTip("Generations kept in flight at once per host (match OLLAMA_NUM_PARALLEL)")
+
+        batch_layout.addWidget(concurrency_label)
+        batch_layout.addWidget(self.concurrency_spin)
+
+        per_request_label = QLabel("Ideas per Request:")
+        self.per_request_spin = QSpinBox()
+        self.per_request_spin.setRange(1, MAX_IDEAS_PER_REQUEST)
+        self.per_request_spin.setValue(1)
+        self.per_request_spin.setToolTip(
+            "Ask for several ideas in each request and split the response, "
+            "so the prompt is evaluated once per request instead of once per idea"
+        )
+        self.multi_format_combo = QComboBox()
+        self.multi_format_combo.addItems(MULTI_FORMATS)
+        self.multi_format_combo.setToolTip("Separate the ideas with a delimiter line or ask for a JSON list")
+
+        batch_layout.addWidget(per_request_label)
+        batch_layout.addWidget(self.per_request_spin)
+        batch_layout.addWidget(self.multi_format_combo)
+
+        self.structured_check = QCheckBox("Structured Output")
+        self.structured_check.setToolTip(
+            "Have the model fill a JSON schema with title, body and tags, "
+            "instead of guessing the title from the markdown"
+        )
+        batch_layout.addWidget(self.structured_check)
+
+        timeout_label = QLabel("Request Timeout:")
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setValue(0)
+        self.timeout_spin.setSuffix(" s")
+        self.timeout_spin.setSpecialValueText("None")
+        self.timeout_spin.setToolTip("Maximum wait for a generation to respond (None waits indefinitely)")
+
+        batch_layout.addWidget(timeout_label)
+        batch_layout.addWidget(self.timeout_spin)
         batch_layout.addStretch()
         
         # Output folder selection
@@ -203,14 +327,180 @@ class MainWindow(QMainWindow):
         browse_button = QPushButton("Browse...")
         browse_button.clicked.connect(self.browse_output_folder)
         
+        self.stream_check = QCheckBox("Stream Tokens")
+        self.stream_check.setToolTip("Write tokens as they arrive and show a live preview")
+
         output_layout.addWidget(output_label)
         output_layout.addWidget(self.output_path)
         output_layout.addWidget(browse_button)
+        output_layout.addWidget(self.stream_check)
+
+        self.resume_check = QCheckBox("Resume Unfinished")
+        self.resume_check.setChecked(True)
+        self.resume_check.setToolTip(
+            "Continue an interrupted batch with the same prompt and size in this folder"
+        )
+        output_layout.addWidget(self.resume_check)
+
+        self.sync_check = QCheckBox("Sync Writes")
+        self.sync_check.setToolTip("fsync ideas before publishing them (safer on power loss, slower)")
+        output_layout.addWidget(self.sync_check)
+
+        format_label = QLabel("Format:")
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(OUTPUT_FORMATS)
+        self.format_combo.setToolTip(
+            "md writes one file per idea; jsonl, jsonl.zst and sqlite pack the batch into one file "
+            "(export with: python ideation.py export)"
+        )
+        output_layout.addWidget(format_label)
+        output_layout.addWidget(self.format_combo)
+
+        layout_label = QLabel("Layout:")
+        self.layout_combo = QComboBox()
+        self.layout_combo.addItems(OUTPUT_LAYOUTS)
+        self.layout_combo.setToolTip(
+            "flat keeps every .md file in the output folder; hash and date spread them over "
+            "subfolders and list them in manifest.jsonl (use for very large batches)"
+        )
+        output_layout.addWidget(layout_label)
+        output_layout.addWidget(self.layout_combo)
+
+        duplicates_label = QLabel("Duplicates:")
+        self.duplicates_combo = QComboBox()
+        self.duplicates_combo.addItems(DUPLICATE_POLICIES)
+        self.duplicates_combo.setToolTip(
+            "When an idea repeats one already saved in the output folder (ignoring case and "
+            "whitespace): generate it again, skip it, or keep it anyway"
+        )
+
+        # Duplicate and near-duplicate handling
+        dedup_group = QGroupBox("Deduplication")
+        dedup_layout = QHBoxLayout(dedup_group)
+        dedup_layout.addWidget(duplicates_label)
+        dedup_layout.addWidget(self.duplicates_combo)
+
+        near_label = QLabel("Near Duplicates:")
+        self.near_combo = QComboBox()
+        self.near_combo.addItems(NEAR_DUPLICATE_POLICIES)
+        self.near_combo.setToolTip(
+            "Ideas that mostly reuse the wording of a saved one (MinHash similarity): "
+            f"ignore them, save them but list them in {NEAR_DUPLICATES_FILENAME}, or skip them"
+        )
+        dedup_layout.addWidget(near_label)
+        dedup_layout.addWidget(self.near_combo)
+
+        similarity_label = QLabel("Similarity Threshold:")
+        self.similarity_spin = QDoubleSpinBox()
+        self.similarity_spin.setRange(0.1, 1.0)
+        self.similarity_spin.setSingleStep(0.05)
+        self.similarity_spin.setValue(DEFAULT_SIMILARITY_THRESHOLD)
+        self.similarity_spin.setToolTip("Estimated share of word pairs two ideas must have in common")
+        dedup_layout.addWidget(similarity_label)
+        dedup_layout.addWidget(self.similarity_spin)
+
+        embed_label = QLabel("Embed With:")
+        self.embed_input = QLineEdit()
+        self.embed_input.setPlaceholderText(f"off (e.g. {DEFAULT_EMBED_MODEL})")
+        self.embed_input.setToolTip("Embedding model for saved ideas, used by Cluster Ideas (needs numpy)")
+        dedup_layout.addWidget(embed_label)
+        dedup_layout.addWidget(self.embed_input)
+
+        self.cluster_button = QPushButton("Cluster Ideas")
+        self.cluster_button.setToolTip(
+            f"Group the output folder's embedded ideas into {CLUSTERS_FILENAME} "
+            f"and list semantic duplicates in {SEMANTIC_DUPLICATES_FILENAME}"
+        )
+        self.cluster_button.clicked.connect(self.cluster_ideas)
+        dedup_layout.addWidget(self.cluster_button)
+
+        # Sampling options, each a value or a LOW:HIGH[:STEPS] range to sweep
+        sampling_group = QGroupBox("Sampling")
+        sampling_layout = QHBoxLayout(sampling_group)
+
+        self.sampling_inputs = {}
+        for name in SAMPLING_PARAMETERS:
+            self.sampling_inputs[name] = QLineEdit()
+            self.sampling_inputs[name].setPlaceholderText("default")
+            self.sampling_inputs[name].setMaximumWidth(90)
+            self.sampling_inputs[name].setToolTip(
+                f"Ollama's {name}: empty for the model default, a value, or LOW:HIGH[:STEPS] to sweep"
+            )
+            sampling_layout.addWidget(QLabel(f"{name}:"))
+            sampling_layout.addWidget(self.sampling_inputs[name])
+
+        sweep_label = QLabel("Sweep:")
+        self.sweep_combo = QComboBox()
+        self.sweep_combo.addItems(SWEEP_STRATEGIES)
+        self.sweep_combo.setToolTip(
+            "How ranges are spread over the batch: evenly from low to high, "
+            "through every combination of STEPS points, or at random"
+        )
+        sampling_layout.addWidget(sweep_label)
+        sampling_layout.addWidget(self.sweep_combo)
+
+        seed_label = QLabel("Seed:")
+        self.seed_input = QLineEdit()
+        self.seed_input.setPlaceholderText("random")
+        self.seed_input.setMaximumWidth(90)
+        self.seed_input.setToolTip(
+            "Base seed for a reproducible batch (idea N gets seed + N), or START:END to wrap within a range"
+        )
+        self.cache_check = QCheckBox("Cache Responses")
+        self.cache_check.setToolTip(
+            f"Replay seeded responses from {DEFAULT_CACHE_DIR} instead of asking the model again"
+        )
+        sampling_layout.addWidget(seed_label)
+        sampling_layout.addWidget(self.seed_input)
+        sampling_layout.addWidget(self.cache_check)
+        
+        # Ollama hosts to spread generations across
+        server_group = QGroupBox("Server Settings")
+        server_layout = QHBoxLayout(server_group)
+
+        hosts_label = QLabel("Ollama Hosts:")
+        self.hosts_input = QLineEdit()
+        self.hosts_input.setText(OLLAMA_HOST)
+        self.hosts_input.setToolTip("Comma-separated Ollama endpoints, e.g. http://gpu1:11434, http://gpu2:11434")
+
+        self.hosts_input.editingFinished.connect(self.on_hosts_changed)
+
+        model_label = QLabel("Model:")
+        self.model_combo = QComboBox()
+        self.model_combo.setEditable(True)
+        self.model_combo.setMinimumWidth(200)
+        self.model_combo.addItems(self.merge_models([]))
+        self.model_combo.setCurrentText(DEFAULT_MODEL)
+
+        keep_alive_label = QLabel("Keep Alive:")
+        self.keep_alive_input = QLineEdit(DEFAULT_KEEP_ALIVE)
+        self.keep_alive_input.setMaximumWidth(60)
+        self.keep_alive_input.setToolTip(
+            "How long Ollama keeps the model loaded between requests during a batch "
+            "(e.g. 30m, 2h, -1 for forever); reset to Ollama's default afterwards"
+        )
+        self.preload_check = QCheckBox("Preload")
+        self.preload_check.setChecked(True)
+        self.preload_check.setToolTip("Load the model on every host before the first idea")
+
+        self.server_status = QLabel("Checking Ollama...")
+
+        server_layout.addWidget(hosts_label)
+        server_layout.addWidget(self.hosts_input)
+        server_layout.addWidget(model_label)
+        server_layout.addWidget(self.model_combo)
+        server_layout.addWidget(keep_alive_label)
+        server_layout.addWidget(self.keep_alive_input)
+        server_layout.addWidget(self.preload_check)
+        server_layout.addWidget(self.server_status)
         
         # Add configuration widgets to layout
         config_layout.addWidget(prompt_group)
+        config_layout.addWidget(server_group)
         config_layout.addWidget(batch_group)
         config_layout.addWidget(output_group)
+        config_layout.addWidget(dedup_group)
+        config_layout.addWidget(sampling_group)
         
         # Control buttons
         button_layout = QHBoxLayout()
@@ -218,11 +508,16 @@ class MainWindow(QMainWindow):
         self.start_button = QPushButton("Start Ideation")
         self.start_button.clicked.connect(self.start_ideation)
         
+        self.retry_button = QPushButton("Retry Failed")
+        self.retry_button.setToolTip(f"Re-run ideas recorded in the output folder's {DEAD_LETTER_FILENAME}")
+        self.retry_button.clicked.connect(self.retry_failed)
+        
         self.stop_button = QPushButton("Stop")
         self.stop_button.clicked.connect(self.stop_ideation)
         self.stop_button.setEnabled(False)
         
         button_layout.addWidget(self.start_button)
+        button_layout.addWidget(self.retry_button)
         button_layout.addWidget(self.stop_button)
         
         config_layout.addLayout(button_layout)
@@ -232,29 +527,44 @@ class MainWindow(QMainWindow):
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
         config_layout.addWidget(self.progress_bar)
+
+        self.rate_label = QLabel("Adaptive rate: idle")
+        config_layout.addWidget(self.rate_label)
         
         # Bottom section - Terminal output
         terminal_group = QGroupBox("Terminal Output")
         terminal_layout = QVBoxLayout(terminal_group)
         
-        self.terminal = QTextEdit()
-        self.terminal.setReadOnly(True)
+        self.terminal = LogView()
         self.terminal.setFont(QFont("Monospace", 10))
         self.terminal.setStyleSheet("background-color: #2b2b2b; color: #f0f0f0;")
         
         terminal_layout.addWidget(self.terminal)
+
+        # Live preview of the idea currently being streamed
+        preview_group = QGroupBox("Live Preview")
+        preview_layout = QVBoxLayout(preview_group)
+
+        self.preview_label = QLabel("Enable \"Stream Tokens\" to preview ideas as they are generated.")
+        self.preview = QPlainTextEdit()
+        self.preview.setReadOnly(True)
+        self.preview.setFont(QFont("Monospace", 10))
+
+        preview_layout.addWidget(self.preview_label)
+        preview_layout.addWidget(self.preview)
         
         # Add widgets to splitter
         splitter.addWidget(config_widget)
+        splitter.addWidget(preview_group)
         splitter.addWidget(terminal_group)
         
         # Set initial splitter sizes
-        splitter.setSizes([400, 200])
+        splitter.setSizes([400, 150, 200])
         
         self.setCentralWidget(main_widget)
         
         # Add initial message to terminal
-        self.log_message(f"Ollama Ideation UI initialized. Using model: {MODEL}")
+        self.log_message(f"Ollama Ideation UI initialized. Default model: {DEFAULT_MODEL}")
         self.log_message("Ready to start ideation. Configure your prompt and settings above.")
     
     def on_batch_size_changed(self, text):
@@ -291,67 +601,237 @@ class MainWindow(QMainWindow):
         batch_size = self.get_batch_size()
         output_folder = self.output_path.text()
         
-        # Verify Ollama is running
+        hosts = self.check_ollama()
+        if not hosts:
+            return
+
+        resume_run = None
+        if self.resume_check.isChecked() and os.path.isdir(output_folder):
+            job = JobJournal(output_folder).load().find_resumable(prompt, batch_size, self.current_model())
+            if job:
+                resume_run = job["run"]
+
         try:
-            response = requests.get("http://localhost:11434/api/tags")
-            if response.status_code != 200:
-                self.log_message("Error: Ollama API is not responding. Make sure Ollama is running.")
-                return
-        except requests.RequestException:
-            self.log_message("Error: Could not connect to Ollama API. Make sure Ollama is running.")
+            worker = self.create_worker(prompt, batch_size, output_folder, hosts, resume_run=resume_run)
+        except ValueError as e:
+            self.log_message(f"Error: {e}")
             return
+        self.start_worker(worker)
         
-        # Start the worker thread
-        self.worker = OllamaIdeationWorker(prompt, batch_size, output_folder)
-        self.worker.progress_updated.connect(self.update_progress)
-        self.worker.output_received.connect(self.log_message)
-        self.worker.idea_generated.connect(self.on_idea_generated)
-        self.worker.error_occurred.connect(self.log_error)
+        if resume_run:
+            self.log_message(f"Resuming unfinished batch {resume_run} from {JOURNAL_FILENAME}")
+        self.log_message(f"Starting ideation with batch size: {batch_size} ({worker.concurrency} concurrent requests)")
+        self.log_message(f"Ollama hosts: {', '.join(hosts)}")
+        self.log_message(f"Model: {worker.model}")
+        self.log_message(f"Output folder: {output_folder}")
+
+    def retry_failed(self):
+        """Re-run the ideas listed in the output folder's dead-letter file"""
+        output_folder = self.output_path.text()
+        entries = list(load_dead_letters(output_folder).values())
+        if not entries:
+            self.log_message(f"No failed ideas recorded in {output_folder}.")
+            return
+
+        hosts = self.check_ollama()
+        if not hosts:
+            return
+
+        try:
+            worker = self.create_worker(None, len(entries), output_folder, hosts, entries)
+        except ValueError as e:
+            self.log_message(f"Error: {e}")
+            return
+        self.start_worker(worker)
+
+        self.log_message(f"Retrying {len(entries)} failed ideas ({worker.concurrency} concurrent requests)")
+        self.log_message(f"Output folder: {output_folder}")
+
+    def cluster_ideas(self):
+        """Cluster the output folder's embedded ideas on a background thread"""
+        model = self.embed_input.text().strip() or DEFAULT_EMBED_MODEL
+        self.cluster_worker = ClusterWorker(self.output_path.text(), model)
+        self.cluster_worker.clustered.connect(self.on_clustered)
+        self.cluster_worker.failed.connect(self.on_cluster_failed)
+        self.cluster_button.setEnabled(False)
+        self.log_message(f"Clustering ideas in {self.cluster_worker.output_folder}...")
+        self.cluster_worker.start()
+
+    def on_clustered(self, clusters, duplicates):
+        self.cluster_button.setEnabled(True)
+        output_folder = self.cluster_worker.output_folder
+        self.log_message(
+            f"Wrote {clusters} clusters to {os.path.join(output_folder, CLUSTERS_FILENAME)} "
+            f"and {duplicates} semantic duplicates to {SEMANTIC_DUPLICATES_FILENAME}"
+        )
+
+    def on_cluster_failed(self, message):
+        self.cluster_button.setEnabled(True)
+        self.log_error(f"Error: {message}")
+        self.log_message("Ideas from earlier batches can be embedded with: python ideation.py embed")
+
+    def check_ollama(self):
+        """Pick hosts from the discovery cache; returns the usable ones"""
+        usable = []
+        for host in parse_hosts(self.hosts_input.text()):
+            status = self.host_status.get(host)
+            if status is None:
+                # Not polled yet; the worker's health checks will eject it if it's down
+                usable.append(host)
+            elif status["reachable"]:
+                usable.append(host)
+            else:
+                self.log_message(f"Warning: Could not connect to Ollama API at {host}, skipping it.")
+
+        if not usable:
+            self.log_message("Error: Could not connect to Ollama API. Make sure Ollama is running.")
+            self.discovery.refresh()
+        return usable
+
+    def current_model(self):
+        return self.model_combo.currentText().strip() or DEFAULT_MODEL
+
+    def merge_models(self, discovered):
+        """Discovered models first, then models.txt, without duplicates"""
+        models = []
+        for model in list(discovered) + load_model_list() + [DEFAULT_MODEL]:
+            if model not in models:
+                models.append(model)
+        return models
+
+    def on_hosts_changed(self):
+        """Start polling the edited host list"""
+        self.discovery.set_hosts(parse_hosts(self.hosts_input.text()))
+
+    def on_host_status(self, status):
+        """Update the cached host health and the model picker"""
+        self.host_status = status
+        discovered, loaded = [], []
+        for host_status in status.values():
+            discovered.extend(host_status["models"])
+            loaded.extend(host_status["loaded"])
+
+        current = self.current_model()
+        self.model_combo.blockSignals(True)
+        self.model_combo.clear()
+        self.model_combo.addItems(self.merge_models(discovered))
+        self.model_combo.setCurrentText(current)
+        self.model_combo.blockSignals(False)
+
+        up = sum(1 for host_status in status.values() if host_status["reachable"])
+        text = f"{up}/{len(status)} hosts up"
+        if loaded:
+            text += f", loaded: {', '.join(sorted(set(loaded)))}"
+        self.server_status.setText(text)
+        self.server_status.setToolTip("\n".join(
+            f"{host}: {host_status['error'] or 'ok'}" for host, host_status in status.items()
+        ))
+
+    def create_worker(self, prompt, batch_size, output_folder, hosts, retry_entries=None,
+                      resume_run=None):
+        """Build a worker from the current settings"""
+        concurrency = self.concurrency_spin.value()
+        timeout = self.timeout_spin.value()
+        connection_settings = replace(
+            self.connection_settings, read_timeout=float(timeout) if timeout else None
+        )
+        stream = self.stream_check.isChecked()
+        return OllamaIdeationWorker(
+            prompt, batch_size, output_folder, concurrency, connection_settings, stream,
+            retry_entries, hosts, resume_run, self.sync_check.isChecked(), self.current_model(),
+            output_format=self.format_combo.currentText(),
+            layout=self.layout_combo.currentText(),
+            duplicates=self.duplicates_combo.currentText(),
+            near_duplicates=self.near_combo.currentText(),
+            similarity_threshold=self.similarity_spin.value(),
+            embed_model=self.embed_input.text().strip() or None,
+            keep_alive=self.keep_alive_input.text(),
+            preload=self.preload_check.isChecked(),
+            ideas_per_request=self.per_request_spin.value(),
+            multi_format=self.multi_format_combo.currentText(),
+            structured=self.structured_check.isChecked(),
+            seed=self.seed_input.text().strip() or None,
+            sampling={name: field.text().strip() for name, field in self.sampling_inputs.items()},
+            sweep=self.sweep_combo.currentText(),
+            cache=self.cache_check.isChecked(),
+        )
+
+    def start_worker(self, worker):
+        """Connect the worker's signals and start it"""
+        self.worker = worker
+        self.worker.status_updated.connect(self.on_status_updated)
         self.worker.finished.connect(self.on_ideation_finished)
         
         self.worker.start()
         
         # Update UI state
         self.start_button.setEnabled(False)
+        self.retry_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.progress_bar.setValue(0)
-        
-        self.log_message(f"Starting ideation with batch size: {batch_size}")
-        self.log_message(f"Output folder: {output_folder}")
     
     def stop_ideation(self):
         """Stop the ideation process"""
         if self.worker and self.worker.isRunning():
             self.log_message("Stopping ideation process...")
+            # Returns immediately; on_ideation_finished runs once the worker
+            # has cancelled its requests and saved what it already had
+            self.stop_button.setEnabled(False)
             self.worker.stop()
     
-    def update_progress(self, value):
-        """Update the progress bar"""
-        self.progress_bar.setValue(value)
-    
+    def on_status_updated(self, update):
+        """Apply one coalesced status update from the worker"""
+        # Just log the filenames, the window never needs the full content
+        for filename in update["saved_files"]:
+            self.terminal.log(f"Generated: {filename}")
+        for message, error in update["log"]:
+            self.terminal.log(message, error)
+
+        if update["batch_size"]:
+            self.progress_bar.setValue(int(update["completed"] / update["batch_size"] * 100))
+        self.rate_label.setText(
+            f"Adaptive rate: {update['limit']}/{self.worker.concurrency} in flight, "
+            f"{update['ideas_per_minute']:.1f} ideas/min, {update['duplicates']} duplicates, "
+            f"{update['near_duplicates']} near duplicates, {update['cold_loads']} cold loads, "
+            f"{update['cache_hits']} cached"
+        )
+
+        preview = update.get("preview")
+        if preview:
+            if preview["reset"]:
+                self.preview.clear()
+                self.preview_label.setText(
+                    f"Idea {preview['slot']+1} (first token after {preview['ttft']:.2f}s)"
+                )
+            self.preview.moveCursor(QTextCursor.MoveOperation.End)
+            self.preview.insertPlainText(preview["text"])
+
     def log_message(self, message):
         """Add a message to the terminal output"""
-        self.terminal.append(message)
-        # Auto-scroll to bottom
-        cursor = self.terminal.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.terminal.setTextCursor(cursor)
+        self.terminal.log(message)
     
     def log_error(self, error_message):
         """Log an error message with highlighting"""
-        self.terminal.append(f"<span style='color: #ff6b6b;'>{error_message}</span>")
-    
-    def on_idea_generated(self, filename, content):
-        """Handle when an idea is generated"""
-        # Just log the filename, we don't need to display the full content
-        self.log_message(f"Generated: {filename}")
+        self.terminal.log(error_message, error=True)
     
     def on_ideation_finished(self):
         """Handle when the ideation process is finished"""
         self.start_button.setEnabled(True)
+        self.retry_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.log_message("Ideation process completed.")
 
+    def closeEvent(self, event):
+        """Stop any running batch and the discovery thread"""
+        if self.worker and self.worker.isRunning():
+            self.worker.stop()
+            self.worker.wait()
+        if self.cluster_worker and self.cluster_worker.isRunning():
+            self.cluster_worker.wait()
+        self.discovery.stop()
+        self.discovery.wait()
+        super().closeEvent(event)
+
 
 def main():
     """Main application entry point"""
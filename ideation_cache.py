@@ -0,0 +1,86 @@
+"""
+On-disk response cache for Ollama Ideation.
+
+Responses are stored in SQLite under a hash of the full request payload
+(model, prompts, format, options and seed), so re-running a seeded batch
+replays the model's answers instead of generating them again. The cache is
+trimmed to a size limit by evicting the least recently used responses.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ollama-ideation")
+CACHE_FILENAME = "responses.sqlite"
+DEFAULT_CACHE_SIZE_MB = 512
+# Payload fields that don't change what the model answers
+UNCACHED_FIELDS = ("stream", "keep_alive")
+
+
+def cache_key(payload):
+    """Content address of a request: hash of its canonical JSON"""
+    relevant = {key: value for key, value in payload.items() if key not in UNCACHED_FIELDS}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(payload):
+    """Only seeded requests give the same answer twice, so only they are cached"""
+    return (payload.get("options") or {}).get("seed") is not None
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache of response texts, bounded by total size"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._db:
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode("utf-8"))
+        with self._db:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used responses until the cache fits again"""
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY last_used")
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def close(self):
+        self._db.close()
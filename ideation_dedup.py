@@ -0,0 +1,153 @@
+"""
+Near-duplicate detection for Ollama Ideation.
+
+Ideas are reduced to MinHash signatures over word shingles and indexed with
+locality-sensitive hashing, so finding ideas that are probably similar to a
+new one only looks at a few LSH buckets instead of every saved idea.
+"""
+import os
+import re
+import json
+import zlib
+import base64
+import random
+from array import array
+
+from ideation_store import iter_saved_ideas
+
+# Signatures of the ideas in an output folder, one JSON object per line
+MINHASH_FILENAME = ".minhash_index.jsonl"
+# Ideas saved despite looking like an earlier one (flag policy)
+NEAR_DUPLICATES_FILENAME = "near_duplicates.jsonl"
+# What to do with a near duplicate: nothing, save it but report it, or drop it
+NEAR_DUPLICATE_POLICIES = ("off", "flag", "skip")
+DEFAULT_SIMILARITY_THRESHOLD = 0.6
+NUM_PERM = 120  # many divisors, so the LSH bands can follow the threshold
+SHINGLE_SIZE = 2  # words per shingle
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+
+
+def _permutations(num_perm, seed=1):
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+
+def choose_bands(threshold, num_perm=NUM_PERM):
+    """Pick (bands, rows) whose LSH threshold (1/b)^(1/r) is just below threshold.
+
+    Erring low keeps recall high; candidates are checked against the real
+    threshold afterwards anyway.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+def shingles(content):
+    words = re.findall(r"\w+", content.casefold())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+class MinHashIndex:
+    """Incremental MinHash/LSH index of the ideas in an output folder.
+
+    Signatures are added as ideas are generated and appended to
+    MINHASH_FILENAME once they are saved. A folder without that file is
+    indexed once from its existing ideas.
+    """
+
+    def __init__(self, output_folder, threshold=DEFAULT_SIMILARITY_THRESHOLD, num_perm=NUM_PERM):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, MINHASH_FILENAME)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        self.permutations = _permutations(num_perm)
+        self.signatures = []
+        self.names = []  # None until the idea is saved
+        self.buckets = [{} for _ in range(self.bands)]
+        self._file = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        signature = array('I', base64.b64decode(record["sig"]))
+                    except (ValueError, KeyError):
+                        continue  # torn last line from a crash
+                    if len(signature) == self.num_perm:
+                        self.names.append(record["name"])
+                        self._insert(signature)
+            return self
+
+        for name, content in iter_saved_ideas(self.output_folder):
+            self.record(self.add(self.signature(content)), name)
+        return self
+
+    def signature(self, content):
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(content)]
+        return array('I', (
+            min((a * h + b) % _PRIME for h in hashes) & _MASK
+            for a, b in self.permutations
+        ))
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _insert(self, signature):
+        idea_id = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in self._band_keys(signature):
+            self.buckets[band].setdefault(key, []).append(idea_id)
+        return idea_id
+
+    def query(self, signature):
+        """Most similar indexed idea as (id, estimated Jaccard similarity), or None"""
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        best = None
+        for idea_id in candidates:
+            other = self.signatures[idea_id]
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (idea_id, similarity)
+        return best
+
+    def add(self, signature):
+        """Index a new idea; returns its id for record()"""
+        self.names.append(None)
+        return self._insert(signature)
+
+    def name(self, idea_id):
+        return self.names[idea_id] or "an idea still being written"
+
+    def record(self, idea_id, name):
+        """Persist a saved idea's signature under its name"""
+        self.names[idea_id] = name
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        sig = base64.b64encode(self.signatures[idea_id].tobytes()).decode("ascii")
+        self._file.write(json.dumps({"name": name, "sig": sig}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def append_near_duplicate(output_folder, entry):
+    with open(os.path.join(output_folder, NEAR_DUPLICATES_FILENAME), 'a') as f:
+        f.write(json.dumps(entry) + "\n")
@@ -0,0 +1,262 @@
+"""
+Embeddings, semantic dedup and clustering for Ollama Ideation.
+
+Saved ideas can be embedded with an Ollama embedding model. Vectors are
+normalized and appended to a float16 matrix in the output folder, read back
+as a NumPy memmap, so cosine similarity over the whole folder is a handful
+of matrix products. cluster_folder() groups the ideas with k-means and
+writes a browsable clusters.md.
+
+NumPy is optional; it is only needed for this module, and only imported
+once embeddings are actually used.
+"""
+import os
+import json
+import math
+
+from ideation_store import CLUSTERS_FILENAME, iter_saved_ideas
+
+EMBED_PATH = "/api/embed"
+LEGACY_EMBED_PATH = "/api/embeddings"  # Ollama before 0.3.4, one text per request
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+# Normalized float16 vectors, one row per idea, and the matching idea names
+VECTORS_FILENAME = ".embeddings.f16"
+NAMES_FILENAME = ".embeddings.jsonl"
+SEMANTIC_DUPLICATES_FILENAME = "semantic_duplicates.jsonl"
+DEFAULT_SEMANTIC_THRESHOLD = 0.95
+EMBED_BATCH_SIZE = 32  # texts per request when backfilling a folder
+KMEANS_ITERATIONS = 50
+SIMILARITY_BLOCK = 1024  # rows per block of the pairwise similarity pass
+
+np = None  # numpy, imported by require_numpy() on first use
+
+
+def require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Embeddings need the numpy package (pip install numpy)") from None
+        np = numpy
+    return np
+
+
+def _parse_embeddings(result):
+    if "embeddings" in result:
+        return result["embeddings"]
+    return [result["embedding"]]
+
+
+def embed(client, host_url, model, texts):
+    """Embed texts with a blocking httpx.Client; returns one vector per text"""
+    response = client.post(f"{host_url}{EMBED_PATH}", json={"model": model, "input": texts})
+    if response.status_code == 404 and "model" not in response.text:
+        # Older server without /api/embed
+        vectors = []
+        for text in texts:
+            response = client.post(f"{host_url}{LEGACY_EMBED_PATH}", json={"model": model, "prompt": text})
+            response.raise_for_status()
+            vectors.extend(_parse_embeddings(response.json()))
+        return vectors
+    response.raise_for_status()
+    return _parse_embeddings(response.json())
+
+
+async def embed_async(client, host_url, model, texts):
+    """embed() for an httpx.AsyncClient"""
+    response = await client.post(f"{host_url}{EMBED_PATH}", json={"model": model, "input": texts})
+    if response.status_code == 404 and "model" not in response.text:
+        vectors = []
+        for text in texts:
+            response = await client.post(f"{host_url}{LEGACY_EMBED_PATH}", json={"model": model, "prompt": text})
+            response.raise_for_status()
+            vectors.extend(_parse_embeddings(response.json()))
+        return vectors
+    response.raise_for_status()
+    return _parse_embeddings(response.json())
+
+
+class EmbeddingIndex:
+    """Append-only float16 matrix of idea embeddings in an output folder.
+
+    Rows are written before their names, so after a crash any row without
+    a name is cut off the next time the index is opened.
+    """
+
+    def __init__(self, output_folder, model=DEFAULT_EMBED_MODEL):
+        require_numpy()
+        self.output_folder = output_folder
+        self.model = model
+        self.vectors_path = os.path.join(output_folder, VECTORS_FILENAME)
+        self.names_path = os.path.join(output_folder, NAMES_FILENAME)
+        self.dim = None
+        self.names = []
+        self._vectors_file = None
+        self._names_file = None
+
+    def load(self):
+        if not os.path.exists(self.names_path):
+            return self
+        with open(self.names_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if "dim" in record:
+                    if record["model"] != self.model:
+                        raise RuntimeError(
+                            f"{NAMES_FILENAME} holds {record['model']} embeddings, not {self.model}; "
+                            f"use that model or delete {NAMES_FILENAME} and {VECTORS_FILENAME}"
+                        )
+                    self.dim = record["dim"]
+                else:
+                    self.names.append(record["name"])
+        return self
+
+    def vectors(self):
+        """All stored vectors as a read-only (n, dim) float16 memmap"""
+        if not self.names:
+            return np.zeros((0, self.dim or 0), dtype=np.float16)
+        matrix = np.memmap(self.vectors_path, dtype=np.float16, mode='r')
+        return matrix[:len(self.names) * self.dim].reshape(len(self.names), self.dim)
+
+    def _open(self, dim):
+        if self.dim is None:
+            self.dim = dim
+            with open(self.names_path, 'w') as f:
+                f.write(json.dumps({"model": self.model, "dim": dim}) + "\n")
+        elif dim != self.dim:
+            raise ValueError(f"Embedding has {dim} dimensions, the index {self.dim}")
+        if self._vectors_file is None:
+            self._vectors_file = open(self.vectors_path, 'ab')
+            # Drop rows whose names never made it to disk
+            self._vectors_file.truncate(len(self.names) * self.dim * 2)
+            self._names_file = open(self.names_path, 'a')
+
+    def append(self, name, vector):
+        """Store one idea's embedding, normalized to unit length"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        self._open(len(vector))
+        self._vectors_file.write(vector.astype(np.float16).tobytes())
+        self._vectors_file.flush()
+        self._names_file.write(json.dumps({"name": name}) + "\n")
+        self._names_file.flush()
+        self.names.append(name)
+
+    def close(self):
+        if self._vectors_file is not None:
+            self._vectors_file.close()
+            self._names_file.close()
+            self._vectors_file = self._names_file = None
+
+
+def backfill(index, client, host_url, output_folder, log=print):
+    """Embed every idea in the folder that the index doesn't have yet"""
+    known = set(index.names)
+    pending = [(name, content) for name, content in iter_saved_ideas(output_folder) if name not in known]
+    for start in range(0, len(pending), EMBED_BATCH_SIZE):
+        batch = pending[start:start + EMBED_BATCH_SIZE]
+        vectors = embed(client, host_url, index.model, [content for name, content in batch])
+        for (name, content), vector in zip(batch, vectors):
+            index.append(name, vector)
+        log(f"Embedded {min(start + EMBED_BATCH_SIZE, len(pending))}/{len(pending)} ideas")
+    return len(pending)
+
+
+def semantic_duplicates(vectors, threshold=DEFAULT_SEMANTIC_THRESHOLD):
+    """Pairs (i, j, similarity) with j < i and cosine similarity >= threshold.
+
+    Each idea is paired with its most similar earlier idea only. Works in
+    blocks of rows so memory stays at SIMILARITY_BLOCK x n.
+    """
+    require_numpy()
+    data = np.asarray(vectors, dtype=np.float32)
+    pairs = []
+    for start in range(0, len(data), SIMILARITY_BLOCK):
+        block = data[start:start + SIMILARITY_BLOCK]
+        end = start + len(block)
+        sims = block @ data[:end].T
+        # Only compare with ideas saved before each row
+        rows = np.arange(start, end)[:, None]
+        sims[np.arange(end)[None, :] >= rows] = -1.0
+        best = sims.argmax(axis=1)
+        best_sims = sims[np.arange(len(block)), best]
+        for row in np.nonzero(best_sims >= threshold)[0]:
+            pairs.append((start + int(row), int(best[row]), float(best_sims[row])))
+    return pairs
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means with k-means++ seeding; returns (labels, centroids)"""
+    require_numpy()
+    data = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    centroids = [data[rng.integers(len(data))]]
+    distances = 1.0 - data @ centroids[0]
+    for _ in range(1, k):
+        weights = np.clip(distances, 0, None)
+        total = weights.sum()
+        pick = rng.choice(len(data), p=weights / total) if total > 0 else rng.integers(len(data))
+        centroids.append(data[pick])
+        distances = np.minimum(distances, 1.0 - data @ data[pick])
+    centroids = np.stack(centroids)
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = (data @ centroids.T).argmax(axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # An empty cluster keeps its old centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return labels, centroids
+
+
+def cluster_folder(output_folder, model=DEFAULT_EMBED_MODEL, k=None,
+                   threshold=DEFAULT_SEMANTIC_THRESHOLD):
+    """Cluster the folder's embedded ideas into clusters.md.
+
+    Also lists ideas at least threshold-similar to an earlier one in
+    semantic_duplicates.jsonl. Returns (number of clusters, duplicate pairs).
+    """
+    index = EmbeddingIndex(output_folder, model).load()
+    vectors = index.vectors()
+    if not len(vectors):
+        raise RuntimeError(f"No embeddings in {output_folder}; embed the ideas first")
+    k = max(1, min(k or round(math.sqrt(len(vectors) / 2)), len(vectors)))
+    labels, centroids = kmeans(vectors, k)
+    data = np.asarray(vectors, dtype=np.float32)
+    closeness = (data * centroids[labels]).sum(axis=1)
+
+    with open(os.path.join(output_folder, CLUSTERS_FILENAME), 'w') as f:
+        f.write(f"# Idea clusters\n\n{len(vectors)} ideas in {k} clusters.\n")
+        order = np.argsort(-np.bincount(labels, minlength=k), kind="stable")
+        for number, cluster in enumerate(order, 1):
+            members = np.nonzero(labels == cluster)[0]
+            if not len(members):
+                continue
+            # Most central ideas first; the first one names the cluster
+            members = members[np.argsort(-closeness[members])]
+            f.write(f"\n## {number}. {index.names[members[0]]} ({len(members)} ideas)\n\n")
+            for member in members:
+                name = index.names[member]
+                if name.endswith(".md"):
+                    f.write(f"- [{name}](<{name}>)\n")
+                else:
+                    f.write(f"- {name}\n")
+
+    pairs = semantic_duplicates(data, threshold)
+    with open(os.path.join(output_folder, SEMANTIC_DUPLICATES_FILENAME), 'w') as f:
+        for i, j, similarity in pairs:
+            f.write(json.dumps({
+                "file": index.names[i], "similar_to": index.names[j], "similarity": round(similarity, 4),
+            }) + "\n")
+    return k, len(pairs)
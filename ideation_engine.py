@@ -0,0 +1,1850 @@
+"""
+Ollama Ideation engine - batch idea generation against Ollama's API.
+
+This module has no Qt dependency so the same engine drives the GUI in
+ideation_app.py and the headless runner in ideation.py.
+"""
+import os
+import json
+import threading
+import queue
+import time
+import re
+import random
+import asyncio
+import collections
+import hashlib
+import sqlite3
+import httpx
+from dataclasses import dataclass
+from datetime import datetime
+
+from ideation_store import iter_saved_ideas, open_store, record_name, store_path
+from ideation_dedup import DEFAULT_SIMILARITY_THRESHOLD, MINHASH_FILENAME, MinHashIndex, append_near_duplicate
+from ideation_embed import EmbeddingIndex, embed_async
+from ideation_sampling import SamplingSweep
+from ideation_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB, ResponseCache, cache_key, is_deterministic
+
+# Constants
+OLLAMA_HOST = "http://localhost:11434"
+GENERATE_PATH = "/api/generate"
+TAGS_PATH = "/api/tags"
+PS_PATH = "/api/ps"
+DEFAULT_MODEL = "llama3.2:latest"
+# Extra models offered alongside the discovered ones, one per line
+MODELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.txt")
+# Number of generations kept in flight at once per host; match OLLAMA_NUM_PARALLEL
+DEFAULT_CONCURRENCY = 4
+# Host health: eject a host after this many consecutive failures and probe
+# it again once the cooldown has passed
+EJECT_AFTER_FAILURES = 3
+EJECT_COOLDOWN = 30.0
+HEALTH_CHECK_INTERVAL = 10.0
+HEALTH_CHECK_TIMEOUT = 3.0
+# How long Ollama keeps the model loaded between requests while a batch runs,
+# and what it goes back to afterwards (Ollama's own default)
+DEFAULT_KEEP_ALIVE = "30m"
+IDLE_KEEP_ALIVE = "5m"
+# A request whose load_duration exceeds this paid for loading the model
+COLD_LOAD_SECONDS = 0.5
+# Several ideas per request: separated by a delimiter line, or as a JSON list
+MULTI_FORMATS = ("delimited", "json")
+IDEA_DELIMITER = "===IDEA==="
+MAX_IDEAS_PER_REQUEST = 20
+# Structured output: the model fills this JSON schema via Ollama's format parameter
+IDEA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "body": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["title", "body", "tags"],
+}
+# Default seconds between coalesced status updates; log lines kept between two
+STATUS_INTERVAL = 0.1
+STATUS_MAX_LOG_LINES = 5000
+THROUGHPUT_WINDOW = 60.0  # seconds of saved ideas behind ideas_per_minute
+# Retry policy for failed generations
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRY_BUDGET_RATIO = 0.2  # retries allowed per batch, as a fraction of its size
+MIN_RETRY_BUDGET = 10
+# Slots that ran out of retries, kept in the output folder for a later re-run
+DEAD_LETTER_FILENAME = ".dead_letter.jsonl"
+# Append-only record of batches and their completed slots, used to resume
+JOURNAL_FILENAME = ".ideation_journal.jsonl"
+# Finished ideas waiting for the writer thread before generation has to wait
+WRITE_QUEUE_SIZE = 256
+# Most ideas written (and fsynced) together by the writer thread
+WRITE_BATCH_SIZE = 32
+# Hashes of the normalized content of every idea saved in an output folder
+HASHES_FILENAME = ".content_hashes"
+# What to do with an exact duplicate: generate the slot again, drop it, or save it anyway
+DUPLICATE_POLICIES = ("regenerate", "skip", "keep")
+# Regenerations per slot before a duplicate is dropped
+MAX_DUPLICATE_RETRIES = 3
+# Markdown output layouts: everything in the output folder, or spread over
+# subfolders by a hash prefix of the title or by the day the idea was saved
+OUTPUT_LAYOUTS = ("flat", "hash", "date")
+# Lists every idea saved into a sharded layout, one JSON object per line
+MANIFEST_FILENAME = "manifest.jsonl"
+# Temp and partial files untouched this long are left over from a crash,
+# unless their name says which process owns them
+STALE_TEMP_AGE = 3600.0
+
+
+@dataclass
+class ConnectionSettings:
+    """Connection pool and timeout settings shared by every Ollama call"""
+    pool_size: int = DEFAULT_CONCURRENCY
+    keepalive_expiry: float = 30.0  # seconds an idle connection is kept open
+    connect_timeout: float = 5.0
+    read_timeout: float = None  # None waits for long generations to finish
+
+    def limits(self, min_pool_size=1):
+        """Build the httpx pool limits, growing the pool to fit the caller"""
+        pool_size = max(self.pool_size, min_pool_size)
+        return httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self):
+        """Build the httpx timeout; only the read phase may be unbounded"""
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.connect_timeout,
+            pool=None,
+        )
+
+
+class OllamaError(Exception):
+    """Error reported by Ollama in the body of a response"""
+
+
+# Failures worth retrying; anything else aborts the batch
+RETRYABLE_ERRORS = (httpx.HTTPError, OllamaError, json.JSONDecodeError)
+
+
+def create_client(settings, min_pool_size=1):
+    """Create a pooled, keep-alive client for blocking Ollama calls"""
+    return httpx.Client(limits=settings.limits(min_pool_size), timeout=settings.timeout())
+
+
+def create_async_client(settings, min_pool_size=1):
+    """Create a pooled, keep-alive client for the generation event loop"""
+    return httpx.AsyncClient(limits=settings.limits(min_pool_size), timeout=settings.timeout())
+
+
+def dead_letter_key(run_id, slot):
+    return f"{run_id}:{slot}"
+
+
+def load_dead_letters(output_folder):
+    """Read the dead-letter file of a folder; later lines supersede earlier ones"""
+    dead_letters = {}
+    path = os.path.join(output_folder, DEAD_LETTER_FILENAME)
+    if not os.path.exists(path):
+        return dead_letters
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = dead_letter_key(entry["run"], entry["slot"])
+            if entry.get("resolved"):
+                dead_letters.pop(key, None)
+            else:
+                dead_letters[key] = entry
+    return dead_letters
+
+
+def append_dead_letter(output_folder, entry):
+    """Append a failure (or a resolution of one) as soon as it happens"""
+    path = os.path.join(output_folder, DEAD_LETTER_FILENAME)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def save_dead_letters(output_folder, dead_letters):
+    """Rewrite the dead-letter file with only the slots that still failed"""
+    path = os.path.join(output_folder, DEAD_LETTER_FILENAME)
+    if not dead_letters:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w') as f:
+        for entry in dead_letters.values():
+            f.write(json.dumps(entry) + "\n")
+
+
+class JobJournal:
+    """Append-only JSONL journal of the batches run in an output folder.
+
+    Each batch writes a "job" record when it starts, a "done" record per
+    saved slot and an "end" record once every slot has been attempted. A job
+    without an "end" record was interrupted and can be resumed from the
+    slots it has not completed yet.
+    """
+
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, JOURNAL_FILENAME)
+        self.jobs = {}  # run id -> job record plus "done" slots and "ended"
+        self._file = None
+
+    def load(self):
+        """Read the journal once; a torn last line from a crash is ignored"""
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = record.get("type")
+                if kind == "job":
+                    self.jobs[record["run"]] = dict(record, done=set(), ended=False)
+                elif record["run"] not in self.jobs:
+                    continue
+                elif kind == "done":
+                    self.jobs[record["run"]]["done"].add(record["slot"])
+                elif kind == "end":
+                    self.jobs[record["run"]]["ended"] = True
+        return self
+
+    def find_resumable(self, prompt, batch_size, model):
+        """Most recent unfinished job with the same prompt, size and model"""
+        for run_id in sorted(self.jobs, reverse=True):
+            job = self.jobs[run_id]
+            if (not job["ended"] and job["prompt"] == prompt
+                    and job["batch_size"] == batch_size and job["model"] == model):
+                return job
+        return None
+
+    def _write(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def start_job(self, run_id, prompt, batch_size, model):
+        record = {
+            "type": "job",
+            "run": run_id,
+            "prompt": prompt,
+            "batch_size": batch_size,
+            "model": model,
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.jobs[run_id] = dict(record, done=set(), ended=False)
+        self._write(record)
+
+    def record_done(self, run_id, slot, filename):
+        if run_id in self.jobs:
+            self.jobs[run_id]["done"].add(slot)
+        self._write({"type": "done", "run": run_id, "slot": slot, "file": filename})
+
+    def end_job(self, run_id):
+        if run_id in self.jobs:
+            self.jobs[run_id]["ended"] = True
+        self._write({"type": "end", "run": run_id})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def content_hash(content):
+    """Hash of an idea ignoring case and whitespace differences"""
+    normalized = " ".join(content.split()).casefold()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ContentIndex:
+    """Set of content hashes of the ideas saved in an output folder.
+
+    Hashes are kept in memory and appended to HASHES_FILENAME as ideas are
+    saved. A folder without that file is indexed once from its existing
+    .md files and packed stores.
+    """
+
+    def __init__(self, output_folder):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, HASHES_FILENAME)
+        self.hashes = set()
+        self._file = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.hashes.update(line.strip() for line in f if line.strip())
+            return self
+
+        for name, content in iter_saved_ideas(self.output_folder):
+            self.hashes.add(content_hash(content))
+        if self.hashes:
+            with open(self.path, 'w') as f:
+                f.writelines(digest + "\n" for digest in self.hashes)
+        return self
+
+    def claim(self, digest):
+        """Reserve a hash for an idea about to be saved; False if already taken"""
+        if digest in self.hashes:
+            return False
+        self.hashes.add(digest)
+        return True
+
+    def record(self, digest):
+        """Persist the hash of a saved idea"""
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(digest + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _process_running(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, but belongs to someone else
+    return True
+
+
+def is_stale_temp_file(entry):
+    """Whether a .tmp/.partial file was left behind rather than being written right now"""
+    match = re.match(r'\.write_(\d+)_\d+\.tmp$', entry.name)
+    if match and int(match.group(1)) != os.getpid() and not _process_running(int(match.group(1))):
+        return True
+    try:
+        return time.time() - entry.stat().st_mtime > STALE_TEMP_AGE
+    except OSError:
+        return False
+
+
+class FilenameAllocator:
+    """Hand out unique idea filenames without probing the disk per candidate.
+
+    The folder is listed once; after that used names live in memory with a
+    next-suffix counter per base title, so repeated titles cost O(1). Files
+    are published with a no-clobber hard link, which keeps us safe against
+    other writers in the same folder.
+
+    With the "hash" or "date" layout files go into subfolders (shards) so no
+    directory grows past a few hundred entries; each shard is listed the
+    first time it is used and filenames are returned relative to folder.
+    """
+
+    def __init__(self, folder, extension=".md", layout="flat"):
+        self.folder = folder
+        self.extension = extension
+        self.layout = layout
+        self.used = set()
+        self.counters = {}
+        self.scanned = set()
+        self.stale_files = []  # temp/partial files left behind by a crash, not other live writers
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(extension):
+                    self.used.add(entry.name)
+                elif (entry.name.startswith('.') and entry.name.endswith(('.tmp', '.partial'))
+                        and is_stale_temp_file(entry)):
+                    self.stale_files.append(entry.path)
+        self.scanned.add("")
+
+    def shard(self, base):
+        """Subfolder for a title; repeats of a title share one shard"""
+        if self.layout == "hash":
+            return hashlib.sha1(base.encode("utf-8")).hexdigest()[:2]
+        if self.layout == "date":
+            return datetime.now().strftime("%Y-%m-%d")
+        return ""
+
+    def _scan(self, shard):
+        path = os.path.join(self.folder, shard)
+        os.makedirs(path, exist_ok=True)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.extension):
+                    self.used.add(f"{shard}/{entry.name}")
+        self.scanned.add(shard)
+
+    def _candidates(self, shard, base):
+        if shard not in self.scanned:
+            self._scan(shard)
+        prefix = f"{shard}/" if shard else ""
+        n = self.counters.get((shard, base), 0)
+        while True:
+            filename = f"{base}{self.extension}" if n == 0 else f"{base}_{n}{self.extension}"
+            filename = prefix + filename
+            n += 1
+            if filename not in self.used:
+                self.counters[(shard, base)] = n
+                yield filename
+
+    def publish(self, base, source):
+        """Give the finished file at source a unique name; returns (filename, path)"""
+        for filename in self._candidates(self.shard(base), base):
+            filepath = os.path.join(self.folder, filename)
+            self.used.add(filename)
+            try:
+                # Unlike a rename, a link never replaces an existing file
+                os.link(source, filepath)
+            except FileExistsError:
+                # Created behind our back by another writer
+                continue
+            except OSError:
+                # Filesystem without hard links: reserve the name, then
+                # atomically replace the empty reservation
+                try:
+                    with open(filepath, 'x'):
+                        pass
+                except FileExistsError:
+                    continue
+                try:
+                    os.replace(source, filepath)
+                except OSError:
+                    # Don't leave an empty reservation behind
+                    os.remove(filepath)
+                    raise
+                return filename, filepath
+            os.remove(source)
+            return filename, filepath
+
+
+class IdeaWriter:
+    """Dedicated thread that writes finished ideas to disk.
+
+    Generation hands ideas over through a bounded queue and only waits when
+    the disk falls that far behind. Each idea is written to a temp file and
+    then published under its final name, so a crash never leaves a truncated
+    idea. With sync enabled, every batch of queued ideas is fsynced together
+    before it is published.
+
+    Given a packed store (see ideation_store), each batch is appended to it
+    as records instead of being published as separate files.
+    """
+
+    def __init__(self, allocator, on_saved, on_error, sync=False, queue_size=WRITE_QUEUE_SIZE,
+                 store=None):
+        self.allocator = allocator
+        self.on_saved = on_saved  # (context, filename, filepath, content)
+        self.on_error = on_error  # (context, exception)
+        self.sync = sync
+        self.store = store
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self._temp_counter = 0
+
+    def start(self):
+        for path in self.allocator.stale_files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.thread.start()
+
+    async def submit(self, title, content, source=None, context=None, metadata=None):
+        """Queue an idea; source is a file already holding the content (streaming).
+
+        metadata is stored alongside the idea by packed stores.
+        """
+        item = (title, content, source, context, metadata)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure: wait for the writer without blocking the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.queue.put, item)
+
+    def close(self):
+        """Write everything still queued and stop the thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Take whatever else is already waiting so it shares one sync
+            while batch[-1] is not None and len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            items = [item for item in batch if item is not None]
+            try:
+                if self.store is not None:
+                    self._append_batch(items)
+                else:
+                    self._write_batch(items)
+            except Exception as e:
+                # Keep draining the queue, or submit() and close() would block forever
+                for title, content, source, context, metadata in items:
+                    self.on_error(context, e)
+            if stop:
+                break
+        if self.store is not None:
+            self.store.close()
+
+    def _append_batch(self, batch):
+        if not batch:
+            return
+        created = datetime.now().isoformat(timespec="seconds")
+        records = [
+            dict(metadata or {}, name=title, content=content, created=created)
+            for title, content, source, context, metadata in batch
+        ]
+        try:
+            self.store.append(records, sync=self.sync)
+        except (OSError, sqlite3.Error) as e:
+            for title, content, source, context, metadata in batch:
+                self.on_error(context, e)
+            return
+        for title, content, source, context, metadata in batch:
+            if source is not None:
+                # Streamed tokens are in the store now
+                try:
+                    os.remove(source)
+                except OSError:
+                    pass
+            self._report_saved(context, title, self.store.path, content)
+
+    def _report_saved(self, context, filename, filepath, content):
+        """Run on_saved; its bookkeeping failing must not kill the thread"""
+        try:
+            self.on_saved(context, filename, filepath, content)
+        except Exception as e:
+            self.on_error(context, e)
+
+    def _write_batch(self, batch):
+        staged = []
+        for title, content, source, context, metadata in batch:
+            try:
+                if source is None:
+                    self._temp_counter += 1
+                    source = os.path.join(self.allocator.folder, f".write_{os.getpid()}_{self._temp_counter}.tmp")
+                    with open(source, 'w') as f:
+                        f.write(content)
+                        if self.sync:
+                            f.flush()
+                            os.fsync(f.fileno())
+                elif self.sync:
+                    with open(source, 'a') as f:
+                        os.fsync(f.fileno())
+                staged.append((title, content, source, context, metadata))
+            except OSError as e:
+                self.on_error(context, e)
+
+        published = []
+        folders = {self.allocator.folder}
+        for title, content, source, context, metadata in staged:
+            try:
+                filename, filepath = self.allocator.publish(title, source)
+            except OSError as e:
+                self.on_error(context, e)
+                continue
+            published.append(dict(metadata or {}, file=filename))
+            folders.add(os.path.dirname(filepath))
+            self._report_saved(context, filename, filepath, content)
+
+        if published and self.allocator.layout != "flat":
+            try:
+                append_manifest(self.allocator.folder, published)
+            except OSError as e:
+                self.on_error(None, e)  # no single idea to blame
+
+        if self.sync and staged:
+            # Make the new directory entries durable too (POSIX only)
+            for folder in folders:
+                try:
+                    fd = os.open(folder, os.O_RDONLY)
+                except OSError:
+                    continue
+                try:
+                    os.fsync(fd)
+                except OSError:
+                    pass
+                finally:
+                    os.close(fd)
+
+
+def export_markdown(source, destination, layout="flat"):
+    """Write every idea in a packed store out as its own .md file.
+
+    Returns the number of files written.
+    """
+    os.makedirs(destination, exist_ok=True)
+    allocator = FilenameAllocator(destination, layout=layout)
+    temp_path = os.path.join(destination, f".export_{os.getpid()}.tmp")
+    count = 0
+    manifest = []
+    for record in open_store(source):
+        with open(temp_path, 'w') as f:
+            f.write(record["content"])
+        filename, filepath = allocator.publish(record["name"], temp_path)
+        if layout != "flat":
+            manifest.append({"run": record["run"], "slot": record["slot"], "model": record["model"],
+                             "file": filename})
+        count += 1
+    if manifest:
+        append_manifest(destination, manifest)
+    return count
+
+
+def append_manifest(output_folder, entries):
+    """Record saved ideas in the folder's manifest"""
+    with open(os.path.join(output_folder, MANIFEST_FILENAME), 'a') as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def multi_idea_instructions(count, multi_format="delimited"):
+    """System prompt addition asking for several ideas in one response"""
+    if multi_format == "json":
+        return (
+            f"Write {count} different ideas. Respond with a JSON object of the form "
+            '{"ideas": ["<first idea in markdown>", "<second idea in markdown>"]} '
+            f"holding exactly {count} ideas."
+        )
+    return (
+        f"Write {count} different ideas. Start each idea with a markdown heading and put a line "
+        f"containing only {IDEA_DELIMITER} between consecutive ideas."
+    )
+
+
+def _idea_from_json(item):
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        title = item.get("title") or item.get("name") or ""
+        body = item.get("body") or item.get("content") or item.get("description") or ""
+        if title or body:
+            return f"# {title}\n\n{body}".strip() if title else str(body)
+    return json.dumps(item)
+
+
+def split_ideas(text, count, multi_format="delimited"):
+    """Split a response asked to hold count ideas into separate ideas.
+
+    Tries, in order: a JSON list (or {"ideas": [...]}) anywhere in the text,
+    the delimiter line (tolerating markdown decoration around it), top-level
+    headings when there are no more of them than ideas asked for, and finally
+    the whole response as a single idea. An empty JSON list gives no ideas.
+    """
+    parts = None
+    if multi_format == "json" or text.lstrip().startswith(("{", "[")):
+        # The whole response, or the outermost object or list inside chatter
+        candidates = (text, text[text.find("{"):text.rfind("}") + 1], text[text.find("["):text.rfind("]") + 1])
+        for candidate in candidates:
+            try:
+                # strict=False accepts raw newlines inside strings, which models emit
+                data = json.loads(candidate, strict=False)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                data = data["ideas"] if isinstance(data.get("ideas"), list) else [data]
+            if isinstance(data, list):
+                parts = [_idea_from_json(item) for item in data]
+                break
+
+    if parts is None:
+        delimiter = re.compile(r'^[\s*_`#>-]*=+\s*IDEA\s*=+[\s*_`]*$', re.MULTILINE | re.IGNORECASE)
+        if delimiter.search(text):
+            parts = delimiter.split(text)
+        else:
+            # No separators: split before each top-level heading, unless the
+            # ideas evidently use them for their own sections
+            parts = re.split(r'(?m)^(?=#\s)', text)
+            if sum(1 for part in parts if part.lstrip().startswith('#')) > count:
+                parts = [text]
+            elif len(parts) > 1 and not parts[0].lstrip().startswith('#') and len(parts[0].strip()) < 200:
+                # Drop a preamble such as "Here are 3 ideas:" before the first heading
+                parts = parts[1:]
+
+    from_json = parts is not None
+    parts = [part.strip() for part in parts if part and part.strip()]
+    return parts[:count] or ([] if from_json else [text])
+
+
+def structured_format(count):
+    """JSON schema for the format parameter: one idea, or an object listing count ideas"""
+    if count == 1:
+        return IDEA_SCHEMA
+    return {
+        "type": "object",
+        "properties": {
+            "ideas": {"type": "array", "items": IDEA_SCHEMA, "minItems": count, "maxItems": count},
+        },
+        "required": ["ideas"],
+    }
+
+
+def parse_structured(text):
+    """Ideas as dicts with title, body and tags from a structured response.
+
+    Returns None when the response isn't the JSON that was asked for.
+    """
+    try:
+        data = json.loads(text, strict=False)
+    except ValueError:
+        return None
+    if isinstance(data, dict) and isinstance(data.get("ideas"), list):
+        data = data["ideas"]
+    elif isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not data:
+        return None
+    ideas = []
+    for item in data:
+        if not isinstance(item, dict) or not isinstance(item.get("title"), str):
+            return None
+        tags = item.get("tags")
+        ideas.append({
+            "title": item["title"].strip(),
+            "body": str(item.get("body", "")).strip(),
+            "tags": [str(tag) for tag in tags] if isinstance(tags, list) else [],
+        })
+    return ideas
+
+
+def structured_markdown(idea):
+    """Markdown file content for a structured idea"""
+    content = f"# {idea['title']}\n\n{idea['body']}\n"
+    if idea["tags"]:
+        content += f"\nTags: {', '.join(idea['tags'])}\n"
+    return content
+
+
+def model_tag(name):
+    """Full model name as Ollama reports it; a missing tag means :latest"""
+    name = name.strip()
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+def parse_keep_alive(text):
+    """Ollama keep_alive from user input: "30m", "1h", or seconds such as -1 (forever)"""
+    text = str(text).strip()
+    if text.lstrip('-').isdigit():
+        return int(text)
+    return text or DEFAULT_KEEP_ALIVE
+
+
+def load_model_list(path=MODELS_FILE):
+    """Read model names from models.txt, skipping blank and # lines"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def parse_hosts(text):
+    """Split a comma/whitespace separated host list into base URLs"""
+    hosts = []
+    for host in re.split(r'[,\s]+', text):
+        host = host.strip().rstrip('/')
+        if not host:
+            continue
+        if "://" not in host:
+            host = f"http://{host}"
+        if host not in hosts:
+            hosts.append(host)
+    return hosts or [OLLAMA_HOST]
+
+
+class OllamaHost:
+    """Scheduling and health state of one Ollama endpoint"""
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.latency = None  # smoothed seconds per generated token
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.ejected_until
+
+    def score(self):
+        """Expected wait for one more request: queue length times speed"""
+        return (self.outstanding + 1) * (self.latency or 0.0)
+
+
+class HostPool:
+    """Spread generations across several Ollama hosts.
+
+    Requests go to the healthy host with the fewest outstanding requests,
+    weighted by its recent latency. Hosts that keep failing are ejected for
+    a cooldown and come back once a health check or a probe succeeds.
+    """
+
+    def __init__(self, urls):
+        self.hosts = [OllamaHost(url) for url in urls]
+
+    def acquire(self):
+        """Pick a host for the next request"""
+        healthy = [host for host in self.hosts if host.healthy]
+        if healthy:
+            host = min(healthy, key=lambda h: (h.score(), h.outstanding))
+        else:
+            # Everything is ejected; probe the host that comes back first
+            host = min(self.hosts, key=lambda h: h.ejected_until)
+        host.outstanding += 1
+        return host
+
+    def cancel(self, host):
+        """Forget a request to host that was aborted by Stop"""
+        host.outstanding -= 1
+
+    def release(self, host, ok=True, latency=None):
+        """Record the outcome of a request sent to host"""
+        host.outstanding -= 1
+        if ok:
+            host.failures = 0
+            host.ejected_until = 0.0
+            if latency is not None:
+                host.latency = latency if host.latency is None else (
+                    host.latency + host.LATENCY_SMOOTHING * (latency - host.latency)
+                )
+            return None
+        host.failures += 1
+        if host.failures >= EJECT_AFTER_FAILURES and host.healthy:
+            host.ejected_until = time.monotonic() + EJECT_COOLDOWN
+            return f"Ejected {host.url} after {host.failures} consecutive failures"
+        return None
+
+    async def check(self, client, host):
+        """Probe a host's /api/tags; returns True when it answers"""
+        try:
+            response = await client.get(f"{host.url}{TAGS_PATH}", timeout=HEALTH_CHECK_TIMEOUT)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            host.failures += 1
+            host.ejected_until = time.monotonic() + EJECT_COOLDOWN
+            return False
+        host.failures = 0
+        host.ejected_until = 0.0
+        return True
+
+    async def monitor(self, client, on_change):
+        """Periodically health check every host, reporting state changes"""
+        while True:
+            for host in self.hosts:
+                was_healthy = host.healthy
+                ok = await self.check(client, host)
+                if ok and not was_healthy:
+                    on_change(f"Host {host.url} is healthy again")
+                elif not ok and was_healthy:
+                    on_change(f"Host {host.url} failed its health check and was ejected")
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+
+class AdaptiveRateController:
+    """AIMD concurrency limit for generation requests.
+
+    The limit grows by one request per window of successful generations while
+    latency stays near its baseline, and is cut multiplicatively on errors,
+    503/429 responses or a latency spike. Callers wrap every request in
+    acquire()/release(). Latency is time per generated token; round trips
+    (whole request times) only pace how often the limit may be cut.
+    """
+    INCREASE = 1.0  # requests added per window of successes
+    ERROR_DECREASE = 0.5
+    LATENCY_DECREASE = 0.8
+    LATENCY_TOLERANCE = 2.0  # latency above baseline * tolerance counts as congestion
+    BASELINE_SMOOTHING = 0.1
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(max(self.min_limit, self.max_limit // 2))
+        self.in_flight = 0
+        self.baseline = None
+        self.round_trip = None  # smoothed seconds per successful request
+        self._last_decrease = 0.0
+        # Created on first use: before Python 3.10 a Condition binds to the
+        # event loop current at creation, and the engine's loop runs on
+        # another thread than the one constructing it
+        self._condition_object = None
+
+    @property
+    def _condition(self):
+        if self._condition_object is None:
+            self._condition_object = asyncio.Condition()
+        return self._condition_object
+
+    async def acquire(self):
+        """Wait until another request fits under the current limit"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency=None, ok=True, overloaded=False, elapsed=None):
+        """Finish a request and adjust the limit from its outcome"""
+        now = time.monotonic()
+        async with self._condition:
+            self.in_flight -= 1
+            if ok and elapsed is not None:
+                self.round_trip = elapsed if self.round_trip is None else (
+                    self.round_trip + self.BASELINE_SMOOTHING * (elapsed - self.round_trip)
+                )
+            if not ok or overloaded:
+                self._decrease(self.ERROR_DECREASE, now)
+            elif latency is not None:
+                if self.baseline is not None and latency > self.baseline * self.LATENCY_TOLERANCE:
+                    self._decrease(self.LATENCY_DECREASE, now)
+                else:
+                    self.baseline = latency if self.baseline is None else (
+                        self.baseline + self.BASELINE_SMOOTHING * (latency - self.baseline)
+                    )
+                    self.limit = min(self.max_limit, self.limit + self.INCREASE / self.limit)
+            self._condition.notify_all()
+
+    def cancel(self):
+        """Give back the slot of a request aborted by Stop, without judging it"""
+        self.in_flight -= 1
+
+    def _decrease(self, factor, now):
+        # Requests already in flight when we backed off report the same
+        # congestion; only react once per request round trip
+        if now - self._last_decrease < (self.round_trip or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * factor)
+
+
+class BatchStatus:
+    """Collects worker events between two status updates.
+
+    Both the event loop and the writer thread record events here; the
+    engine drains it at a fixed rate and ships one compact update, with
+    filenames rather than idea content, instead of a callback per event.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._log = collections.deque(maxlen=STATUS_MAX_LOG_LINES)  # (message, is_error)
+        self._saved = []  # filenames saved since the last drain
+        self._saved_times = collections.deque()  # when ideas were saved, for the rate
+        self._started = time.monotonic()
+        self._preview_slot = None  # stream being followed, None when free
+        self._preview_shown = None  # stream currently in the preview
+        self._preview_reset = False
+        self._preview_text = []
+        self._preview_ttft = None
+
+    def log(self, message, error=False):
+        with self._lock:
+            self._log.append((message, error))
+
+    def saved(self, filename):
+        with self._lock:
+            self._saved.append(filename)
+            self._saved_times.append(time.monotonic())
+
+    def ideas_per_minute(self, window=THROUGHPUT_WINDOW):
+        """Ideas saved per minute over the last window seconds, cache hits included"""
+        now = time.monotonic()
+        window = max(min(window, now - self._started), 1.0)
+        with self._lock:
+            while self._saved_times and self._saved_times[0] < now - window:
+                self._saved_times.popleft()
+            return len(self._saved_times) * 60.0 / window
+
+    def first_token(self, slot, seconds):
+        """Log time-to-first-token and follow this stream if the preview is free"""
+        with self._lock:
+            self._log.append((f"Idea {slot+1}: first token after {seconds:.2f}s", False))
+            if self._preview_slot is None:
+                self._preview_slot = slot
+                self._preview_shown = slot
+                self._preview_reset = True
+                self._preview_text = []
+                self._preview_ttft = seconds
+
+    def token(self, slot, text):
+        with self._lock:
+            if slot == self._preview_slot:
+                self._preview_text.append(text)
+
+    def stream_finished(self, slot):
+        with self._lock:
+            if slot == self._preview_slot:
+                self._preview_slot = None
+
+    def drain(self):
+        """Return and clear everything recorded since the last drain"""
+        with self._lock:
+            update = {"log": list(self._log), "saved_files": self._saved}
+            self._log.clear()
+            self._saved = []
+            if self._preview_reset or self._preview_text:
+                update["preview"] = {
+                    "slot": self._preview_shown,
+                    "reset": self._preview_reset,
+                    "text": "".join(self._preview_text),
+                    "ttft": self._preview_ttft,
+                }
+                self._preview_reset = False
+                self._preview_text = []
+            return update
+
+
+class IdeationEngine:
+    """Generate a batch of ideas with Ollama; no GUI required.
+
+    run() blocks the calling thread until the batch is done or stopped.
+    Progress is reported through on_status, called every status_interval
+    seconds with one coalesced update (see _emit_status). stop() may be
+    called from any thread.
+    """
+
+    def __init__(self, prompt_template, batch_size, output_folder, concurrency=DEFAULT_CONCURRENCY,
+                 connection_settings=None, stream=False, retry_entries=None, hosts=None,
+                 resume_run=None, sync_writes=False, model=DEFAULT_MODEL, on_status=None,
+                 status_interval=STATUS_INTERVAL, output_format="md", layout="flat",
+                 duplicates="regenerate", near_duplicates="off",
+                 similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD, embed_model=None,
+                 keep_alive=DEFAULT_KEEP_ALIVE, preload=True, ideas_per_request=1,
+                 multi_format="delimited", structured=False, seed=None, sampling=None,
+                 sweep="linear", cache=False,
+                 cache_dir=DEFAULT_CACHE_DIR, cache_size_mb=DEFAULT_CACHE_SIZE_MB):
+        self.prompt_template = prompt_template
+        self.model = model
+        # Dead-letter entries from earlier runs to re-run instead of a fresh batch
+        self.retry_entries = retry_entries
+        self._retry_entries = {dead_letter_key(entry["run"], entry["slot"]): entry for entry in retry_entries or ()}
+        self.batch_size = len(retry_entries) if retry_entries is not None else batch_size
+        self.output_folder = output_folder
+        self.host_pool = HostPool(hosts or [OLLAMA_HOST])
+        # The concurrency setting is per host, so the fleet gets it for each one
+        self.concurrency = max(1, min(concurrency * len(self.host_pool.hosts), self.batch_size))
+        self.connection_settings = connection_settings or ConnectionSettings()
+        self.stream = stream
+        self.is_running = True
+        # Resuming reuses the interrupted batch's run id so its journal
+        # records and dead letters line up
+        self.resume_run = resume_run
+        # Microseconds keep batches started in the same second (scripted or
+        # fully cached runs) from sharing journal records and dead letters
+        self.run_id = resume_run or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.journal = None
+        self.writer = None
+        self.sync_writes = sync_writes
+        # "md" writes one file per idea; the others append to a packed store
+        self.output_format = output_format
+        self.layout = layout
+        self.duplicates = duplicates
+        self.content_index = None
+        # Near duplicates: "off", "flag" (save and report) or "skip"
+        self.near_duplicates = near_duplicates
+        self.similarity_threshold = similarity_threshold
+        self.minhash = None
+        self._minhash_pending = {}  # (run id, slot) -> (index id, similar idea or None)
+        # Embedding model for saved ideas, None to skip the embedding stage
+        self.embed_model = embed_model
+        self.embeddings = None
+        self._embed_pending = {}  # (run id, slot) -> vector
+        # Sent with every request so the model stays loaded for the whole batch
+        self.keep_alive = parse_keep_alive(keep_alive)
+        self.preload = preload
+        # Ideas asked for in each request, and how the model should separate them
+        self.ideas_per_request = max(1, min(ideas_per_request, MAX_IDEAS_PER_REQUEST))
+        self.multi_format = multi_format
+        # Ask for {title, body, tags} JSON instead of free-form markdown
+        self.structured = structured
+        # Base seed (or "START:END" range) and sampling parameters, each a
+        # value or a range swept across the batch; see ideation_sampling
+        self.sampling = SamplingSweep(sampling, sweep, self.batch_size, seed, self.ideas_per_request)
+        # Seeded responses are replayed from the on-disk cache when enabled
+        self.use_cache = cache
+        self.cache_dir = cache_dir
+        self.cache_size_mb = cache_size_mb
+        self.cache = None
+        self._done_slots = set()
+        self._loop = None
+        self._batch_task = None
+        self.status = BatchStatus()
+        self.on_status = on_status
+        self.status_interval = status_interval
+
+        self._completed = 0
+        self._saved = 0
+        self._failed = 0
+        self._duplicates = 0
+        self._near_duplicates = 0
+        self._cold_loads = 0
+        self._load_seconds = 0.0
+        self._retries_left = max(MIN_RETRY_BUDGET, int(self.batch_size * RETRY_BUDGET_RATIO))
+        self.dead_letters = {}
+        self.rate_controller = AdaptiveRateController(self.concurrency)
+
+    @property
+    def completed(self):
+        """Slots finished so far, saved or failed"""
+        return self._completed
+
+    @property
+    def saved(self):
+        return self._saved
+
+    @property
+    def failed(self):
+        return self._failed
+
+    @property
+    def duplicates_found(self):
+        """Exact duplicates generated, whether regenerated or dropped"""
+        return self._duplicates
+
+    @property
+    def near_duplicates_found(self):
+        """Near duplicates skipped or flagged"""
+        return self._near_duplicates
+
+    @property
+    def cache_hits(self):
+        return self.cache.hits if self.cache is not None else 0
+
+    def run(self):
+        """Run the ideation process until the batch is done or stopped"""
+        try:
+            os.makedirs(self.output_folder, exist_ok=True)
+            self.dead_letters = load_dead_letters(self.output_folder)
+            self.journal = JobJournal(self.output_folder).load()
+            if self.duplicates != "keep":
+                self.content_index = ContentIndex(self.output_folder).load()
+            elif os.path.exists(os.path.join(self.output_folder, HASHES_FILENAME)):
+                # Not checking this time, but keep the index complete for later runs that do
+                self.content_index = ContentIndex(self.output_folder)
+            if self.near_duplicates != "off":
+                self.minhash = MinHashIndex(self.output_folder, self.similarity_threshold).load()
+            elif os.path.exists(os.path.join(self.output_folder, MINHASH_FILENAME)):
+                # Only record signatures, so the index stays complete for later runs
+                self.minhash = MinHashIndex(self.output_folder, self.similarity_threshold)
+            if self.embed_model:
+                self.embeddings = EmbeddingIndex(self.output_folder, self.embed_model).load()
+            sampling = self.sampling.describe()
+            if sampling:
+                self.status.log(f"Sampling: {sampling}")
+            if self.use_cache:
+                if not self.sampling.seeded:
+                    self.status.log("Response cache is on but no seed is set; unseeded responses aren't cached.")
+                self.cache = ResponseCache(self.cache_dir, self.cache_size_mb * 1024 * 1024)
+            store = None
+            if self.output_format != "md":
+                store = open_store(store_path(self.output_folder, self.output_format), self.output_format)
+            self.writer = IdeaWriter(
+                FilenameAllocator(self.output_folder, layout=self.layout), self._on_idea_saved, self._on_write_error,
+                sync=self.sync_writes, store=store,
+            )
+            self.writer.start()
+            if self.retry_entries is None:
+                if self.resume_run in self.journal.jobs:
+                    self._done_slots = self.journal.jobs[self.resume_run]["done"]
+                    self._completed = len(self._done_slots)
+                    self.status.log(
+                        f"Resuming batch {self.run_id}: {self._completed}/{self.batch_size} ideas already done\n"
+                    )
+                else:
+                    self.journal.start_job(self.run_id, self.prompt_template, self.batch_size, self.model)
+            finished = False
+            try:
+                asyncio.run(self._run_batch())
+                finished = True
+            finally:
+                # Drain queued writes before the journal is closed, and only
+                # then mark the job as ended
+                self.writer.close()
+                if finished and self.retry_entries is None and self.is_running:
+                    self.journal.end_job(self.run_id)
+                save_dead_letters(self.output_folder, self.dead_letters)
+                self.journal.close()
+                if self.content_index is not None:
+                    self.content_index.close()
+                if self.minhash is not None:
+                    self.minhash.close()
+                if self.embeddings is not None:
+                    self.embeddings.close()
+                if self.cache is not None:
+                    self.cache.close()
+
+            if self.is_running:
+                self.status.log(f"\nCompleted generating {self._saved} ideas!\n")
+            else:
+                self.status.log(
+                    f"\nStopped after saving {self._saved} ideas "
+                    f"({self._completed}/{self.batch_size} slots finished). "
+                    f"Start again with the same settings to resume.\n"
+                )
+            if self._cold_loads:
+                self.status.log(
+                    f"{self._cold_loads} requests waited {self._load_seconds:.1f}s in total for the model "
+                    f"to load; raise keep_alive if the model is being unloaded mid-batch."
+                )
+            if self.cache_hits:
+                self.status.log(f"{self.cache_hits} responses were replayed from the cache in {self.cache_dir}.")
+            if self._duplicates:
+                self.status.log(f"{self._duplicates} duplicate ideas were generated and not saved.")
+            if self._near_duplicates:
+                action = "skipped" if self.near_duplicates == "skip" else "saved and listed in near_duplicates.jsonl"
+                self.status.log(f"{self._near_duplicates} near-duplicate ideas were {action}.")
+            if self._failed:
+                self.status.log(
+                    f"{self._failed} ideas failed after retries; "
+                    f"they are listed in {DEAD_LETTER_FILENAME} and can be re-run with \"Retry Failed\".",
+                    error=True,
+                )
+
+        except Exception as e:
+            self.status.log(f"Error: {str(e)}", error=True)
+
+        self._emit_status()
+
+    def _iter_jobs(self):
+        """Yield (run id, slots, prompt) for every request this worker should make.
+
+        A job covers up to ideas_per_request slots sharing a run and a prompt.
+        """
+        if self.retry_entries is not None:
+            pending = ((entry["run"], entry["slot"], entry["prompt"]) for entry in self.retry_entries)
+        else:
+            pending = (
+                (self.run_id, i, self.prompt_template)
+                for i in range(self.batch_size) if i not in self._done_slots
+            )
+        job = None
+        for run_id, i, prompt in pending:
+            if (job and job[0] == run_id and job[2] == prompt
+                    and len(job[1]) < self.ideas_per_request):
+                job[1].append(i)
+                continue
+            if job:
+                yield job
+            job = (run_id, [i], prompt)
+        if job:
+            yield job
+
+    async def _run_batch(self):
+        """Drive the whole batch on one event loop and one keep-alive client"""
+        self._loop = asyncio.get_running_loop()
+        self._batch_task = asyncio.current_task()
+        if not self.is_running:
+            return
+        reporter = asyncio.create_task(self._report_status())
+        try:
+            await self._generate_batch()
+        except asyncio.CancelledError:
+            # Stop was pressed; in-flight requests have been aborted
+            pass
+        finally:
+            self._batch_task = None
+            reporter.cancel()
+
+    async def _report_status(self):
+        while True:
+            await asyncio.sleep(self.status_interval)
+            self._emit_status()
+
+    def _emit_status(self):
+        """Send everything that happened since the last update in one signal"""
+        update = self.status.drain()
+        update.update(
+            completed=self._completed,
+            batch_size=self.batch_size,
+            saved=self._saved,
+            failed=self._failed,
+            duplicates=self._duplicates,
+            near_duplicates=self._near_duplicates,
+            cold_loads=self._cold_loads,
+            load_seconds=self._load_seconds,
+            cache_hits=self.cache_hits,
+            limit=int(self.rate_controller.limit),
+            ideas_per_minute=self.status.ideas_per_minute(),
+        )
+        if self.on_status is not None:
+            self.on_status(update)
+
+    async def _generate_batch(self):
+        async with create_async_client(self.connection_settings, self.concurrency) as client:
+            # Bounded queue of jobs; the feeder waits once it is full so we
+            # never hold more than a few pending jobs in memory
+            jobs = asyncio.Queue(maxsize=self.concurrency * 2)
+            if self.preload:
+                await self._preload_model(client)
+            monitor = None
+            if len(self.host_pool.hosts) > 1:
+                monitor = asyncio.create_task(
+                    self.host_pool.monitor(client, self.status.log)
+                )
+            tasks = [
+                asyncio.create_task(self._generation_loop(client, jobs))
+                for _ in range(self.concurrency)
+            ]
+
+            try:
+                for job in self._iter_jobs():
+                    if not self.is_running:
+                        break
+                    await self._put_job(jobs, job, tasks)
+
+                # One sentinel per generation task to let them exit
+                for _ in tasks:
+                    await self._put_job(jobs, None, tasks)
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                if monitor:
+                    monitor.cancel()
+                if self.keep_alive != IDLE_KEEP_ALIVE:
+                    # Also after Stop or an error, or the model stays pinned
+                    await self._set_keep_alive(client, IDLE_KEEP_ALIVE)
+
+    async def _put_job(self, jobs, job, tasks):
+        """Queue a job, but raise instead of waiting forever if a generation task died"""
+        put = asyncio.ensure_future(jobs.put(job))
+        running = set(tasks)
+        try:
+            while not put.done():
+                done, running = await asyncio.wait(running | {put}, return_when=asyncio.FIRST_COMPLETED)
+                running.discard(put)
+                for task in done:
+                    if task is not put and not task.cancelled() and task.exception() is not None:
+                        raise task.exception()
+        finally:
+            put.cancel()
+
+    async def _load_model(self, client, host, keep_alive, timeout=httpx.USE_CLIENT_DEFAULT):
+        """Send Ollama an empty prompt, which only (re)loads the model; returns the result"""
+        payload = {"model": self.model, "keep_alive": keep_alive}
+        response = await client.post(f"{host.url}{GENERATE_PATH}", json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def _preload_model(self, client):
+        """Warm the model on every host so the first ideas don't pay the load time"""
+        async def preload(host):
+            started = time.monotonic()
+            try:
+                result = await self._load_model(client, host, self.keep_alive)
+            except RETRYABLE_ERRORS as e:
+                self.status.log(f"Could not preload {self.model} on {host.url}: {str(e)}", error=True)
+                return
+            load = result.get("load_duration", 0) / 1e9
+            self.status.log(
+                f"Preloaded {self.model} on {host.url} in {time.monotonic() - started:.1f}s "
+                f"(load_duration {load:.1f}s, keep_alive {self.keep_alive})"
+            )
+        await asyncio.gather(*(preload(host) for host in self.host_pool.hosts))
+
+    async def _set_keep_alive(self, client, keep_alive):
+        """Hand the model back to Ollama's normal unloading once the batch is done.
+
+        Hosts that have already unloaded the model are skipped, since setting
+        its keep_alive would load it again.
+        """
+        async def release(host):
+            try:
+                if await self._model_loaded(client, host) is False:
+                    return
+                await self._load_model(client, host, keep_alive, timeout=HEALTH_CHECK_TIMEOUT)
+            except RETRYABLE_ERRORS:
+                pass
+        await asyncio.gather(*(release(host) for host in self.host_pool.hosts))
+
+    async def _model_loaded(self, client, host):
+        """Whether a host has the model loaded, or None if it can't tell (no /api/ps)"""
+        try:
+            response = await client.get(f"{host.url}{PS_PATH}", timeout=HEALTH_CHECK_TIMEOUT)
+            response.raise_for_status()
+            loaded = set()
+            for model in response.json()["models"]:
+                loaded.update(model_tag(model.get(field)) for field in ("name", "model") if model.get(field))
+        except (httpx.HTTPError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return model_tag(self.model) in loaded
+
+    async def _generation_loop(self, client, jobs):
+        """Take jobs from the queue and generate the ideas of each job"""
+        while True:
+            job = await jobs.get()
+            if job is None:
+                break
+            if not self.is_running:
+                continue
+            run_id, slots, prompt = job
+            finished = set()
+            try:
+                await self._run_job(client, run_id, slots, prompt, finished)
+            except Exception as e:
+                # A worker dying here would leave the feeder blocked on a full
+                # queue, so unexpected errors (e.g. from the disk) fail the job instead
+                unfinished = [i for i in slots if i not in finished]
+                self.status.log(f"Error ({self._describe_slots(unfinished)}): {str(e)}", error=True)
+                self._fail_slots(run_id, unfinished, prompt, e, 1, self._request_options(run_id, slots[0], 0))
+
+    async def _run_job(self, client, run_id, slots, prompt, finished=None):
+        """Generate a job's slots, retrying failures with jittered exponential backoff.
+
+        Slots left empty, because the response held fewer ideas than asked
+        for or an idea was a duplicate to regenerate, go into the next request.
+        Slots that are done, saved or failed, are added to finished.
+        """
+        finished = set() if finished is None else finished
+        remaining = list(slots)
+        regenerated = collections.Counter()
+        attempt = 0
+        # Every answered request moves on to fresh seeds, so a seeded
+        # regeneration doesn't get the same response back
+        rounds = 0
+        while remaining and self.is_running:
+            attempt += 1
+            options = self._request_options(run_id, remaining[0], rounds)
+            try:
+                ideas = await self._generate_ideas(client, run_id, remaining, prompt, options)
+                if not ideas:
+                    # No progress; retry with fresh seeds against the retry budget
+                    rounds += 1
+                    raise OllamaError("the response held no ideas")
+            except RETRYABLE_ERRORS as e:
+                self.status.log(f"API Error ({self._describe_slots(remaining)}, attempt {attempt}): {str(e)}",
+                                error=True)
+                if not self.is_running:
+                    # Stopped, not failed; the journal lets a resume pick it up
+                    break
+                if not self._should_retry(e, attempt):
+                    self._fail_slots(run_id, remaining, prompt, e, attempt, options)
+                    finished.update(remaining)
+                    break
+                self._retries_left -= 1
+                # Full jitter keeps concurrent retries from arriving in lockstep
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+                await asyncio.sleep(delay)
+                continue
+
+            attempt = 0
+            rounds += 1
+            unfilled = remaining[len(ideas):]
+            for i, (content, source, fields) in zip(remaining, ideas):
+                outcome = await self._save_idea(client, run_id, i, content, source, fields, options)
+                if outcome == "similar":
+                    self._near_duplicates += 1
+                    self.status.log(f"Idea {i+1} is a near duplicate, skipping it")
+                elif outcome == "duplicate":
+                    self._duplicates += 1
+                    if (self.duplicates == "regenerate" and regenerated[i] < MAX_DUPLICATE_RETRIES
+                            and self.is_running):
+                        self.status.log(f"Idea {i+1} is a duplicate, generating it again")
+                        regenerated[i] += 1
+                        unfilled.append(i)
+                        continue
+                    self.status.log(f"Idea {i+1} is a duplicate, skipping it")
+                self._finish_slot(run_id, i)
+                finished.add(i)
+            remaining = sorted(unfilled)
+
+    def _request_options(self, run_id, slot, rounds):
+        """Sampling options for a request starting at slot.
+
+        A retried dead letter replays the options it failed with, moving its
+        seed on by its original batch size per round, so Retry Failed stays
+        reproducible; everything else comes from the sweep.
+        """
+        entry = self._retry_entries.get(dead_letter_key(run_id, slot))
+        if entry is None or "options" not in entry:
+            return self.sampling.options(slot, rounds)
+        options = dict(entry["options"])
+        if "seed" in options:
+            options["seed"] += rounds * entry.get("batch_size", self.batch_size)
+        return options
+
+    def _dead_letter_entry(self, run_id, i, prompt, error, attempts, options):
+        original = self._retry_entries.get(dead_letter_key(run_id, i), {})
+        return {
+            "run": run_id,
+            "slot": i,
+            "prompt": prompt,
+            "error": str(error),
+            "attempts": attempts,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "options": options or {},
+            "batch_size": original.get("batch_size", self.batch_size),
+        }
+
+    def _fail_slots(self, run_id, slots, prompt, error, attempts, options=None):
+        """Dead-letter slots that can't be generated so a later retry can re-run them"""
+        for i in slots:
+            entry = self._dead_letter_entry(run_id, i, prompt, error, attempts, options)
+            self.dead_letters[dead_letter_key(run_id, i)] = entry
+            append_dead_letter(self.output_folder, entry)
+        self._failed += len(slots)
+        self._completed += len(slots)
+
+    def _finish_slot(self, run_id, i):
+        key = dead_letter_key(run_id, i)
+        if key in self.dead_letters:
+            del self.dead_letters[key]
+            append_dead_letter(self.output_folder, {"run": run_id, "slot": i, "resolved": True})
+        # Progress goes out with the next status update
+        self._completed += 1
+
+    def _describe_slots(self, slots):
+        if len(slots) == 1:
+            return f"idea {slots[0]+1}"
+        return f"ideas {', '.join(str(i + 1) for i in slots)}"
+
+    def _should_retry(self, error, attempt):
+        """Retry transient errors while the slot and batch still have budget"""
+        if attempt > MAX_RETRIES or self._retries_left <= 0:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            # Client errors such as an unknown model won't fix themselves
+            status = error.response.status_code
+            return status >= 500 or status in (408, 429)
+        return True
+
+    async def _generate_ideas(self, client, run_id, slots, prompt_template, options=None):
+        """Request the ideas for some slots of a job in one call.
+
+        Returns a list of (content, source, fields) with at most one entry per
+        slot; source is the file already holding a streamed single idea, or
+        None, and fields holds the title and tags of a structured idea.
+        """
+        i = slots[0]
+        multi = self.ideas_per_request > 1
+        # Create the full prompt with system instructions
+        system_prompt = (
+            "You are a creative ideation assistant. Generate unique and varied ideas. "
+            "Avoid repetition and maximize variability between iterations. "
+        )
+        if self.structured:
+            if multi:
+                system_prompt += f"Write {len(slots)} different ideas. "
+            system_prompt += (
+                "For each idea give a concise title (max 50 chars), the idea itself in markdown "
+                "as the body, and a few short topic tags."
+            )
+        else:
+            system_prompt += (
+                "Your response should be in markdown format. "
+                "The filename should be a concise summary of the idea (max 50 chars)."
+            )
+            if multi:
+                system_prompt += " " + multi_idea_instructions(len(slots), self.multi_format)
+
+        prompt = {
+            "model": self.model,
+            "prompt": prompt_template,
+            "system": system_prompt,
+            "stream": self.stream,
+            "keep_alive": self.keep_alive,
+        }
+        if self.structured:
+            prompt["format"] = structured_format(len(slots) if multi else 1)
+        elif multi and self.multi_format == "json":
+            prompt["format"] = "json"
+        if options:
+            prompt["options"] = options
+
+        if len(slots) == 1:
+            self.status.log(f"Generating idea {i+1}/{self.batch_size}...")
+        else:
+            self.status.log(f"Generating {self._describe_slots(slots)} of {self.batch_size}...")
+
+        partial_path = os.path.join(self.output_folder, f".idea_{run_id}_{i}.partial")
+        key = None
+        idea_content = None
+        if self.cache is not None and is_deterministic(prompt):
+            key = cache_key(prompt)
+            idea_content = self.cache.get(key)
+        streamed = False
+        if idea_content is not None:
+            self.status.log(f"{self._describe_slots(slots).capitalize()}: replayed from the response cache")
+        else:
+            idea_content = await self._request(client, i, prompt, partial_path)
+            streamed = self.stream
+            if key is not None:
+                self.cache.put(key, idea_content)
+
+        if not multi and not self.structured:
+            return [(idea_content, partial_path if streamed else None, None)]
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        if self.structured:
+            structured = parse_structured(idea_content)
+            if structured is not None:
+                ideas = [(structured_markdown(idea), None, idea) for idea in structured]
+            else:
+                self.status.log(f"{self._describe_slots(slots).capitalize()}: response wasn't the "
+                                f"requested JSON, falling back to plain text", error=True)
+                ideas = [(content, None, None) for content in split_ideas(idea_content, len(slots))]
+        else:
+            ideas = [
+                (content, None, None)
+                for content in split_ideas(idea_content, len(slots), self.multi_format)
+            ]
+        if len(ideas) < len(slots):
+            self.status.log(f"Asked for {len(slots)} ideas but got {len(ideas)}; requesting the rest again")
+        return ideas[:len(slots)]
+
+    async def _request(self, client, i, prompt, partial_path):
+        """Call Ollama's generate API once and return the response text"""
+        await self.rate_controller.acquire()
+        host = self.host_pool.acquire()
+        url = f"{host.url}{GENERATE_PATH}"
+        started = time.monotonic()
+        released = False
+        try:
+            if self.stream:
+                idea_content, result = await self._stream_idea(client, url, i, prompt, partial_path)
+            else:
+                response = await client.post(url, json=prompt)
+                response.raise_for_status()
+                result = response.json()
+                idea_content = result.get("response", "")
+
+            # Load time is reported separately and isn't congestion
+            load = result.get("load_duration", 0) / 1e9
+            if load >= COLD_LOAD_SECONDS:
+                self._cold_loads += 1
+                self._load_seconds += load
+                self.status.log(f"Idea {i+1} waited {load:.1f}s for {self.model} to load on {host.url}")
+
+            # Judge congestion by time per generated token so long ideas
+            # don't look like a slow server
+            elapsed = max(time.monotonic() - started - load, 0.0)
+            latency = elapsed / max(result.get("eval_count", 1), 1)
+            self.host_pool.release(host, latency=latency)
+            await self.rate_controller.release(latency, elapsed=elapsed)
+            released = True
+
+        except RETRYABLE_ERRORS as e:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            overloaded = (
+                isinstance(e, httpx.HTTPStatusError)
+                and e.response.status_code in (429, 503)
+            )
+            ejected = self.host_pool.release(host, ok=False)
+            if ejected:
+                self.status.log(ejected, error=True)
+            await self.rate_controller.release(ok=False, overloaded=overloaded)
+            released = True
+            raise
+        except asyncio.CancelledError:
+            # Stopped mid-request; neither the host nor the rate is to blame
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            self.host_pool.cancel(host)
+            self.rate_controller.cancel()
+            released = True
+            raise
+        finally:
+            if not released:
+                self.host_pool.release(host, ok=False)
+                await self.rate_controller.release(ok=False)
+            if self.stream:
+                self.status.stream_finished(i)
+
+        return idea_content
+
+    async def _save_idea(self, client, run_id, i, idea_content, source, fields=None, options=None):
+        """Check a generated idea against the saved ones and hand it to the writer.
+
+        Returns "saved", or "duplicate" / "similar" when the idea was not
+        saved because it repeats or resembles a saved one.
+        """
+        if (self.content_index is not None and self.duplicates != "keep"
+                and not self.content_index.claim(content_hash(idea_content))):
+            if source is not None:
+                os.remove(source)
+            return "duplicate"
+
+        if self.minhash is not None:
+            signature = await asyncio.get_running_loop().run_in_executor(
+                None, self.minhash.signature, idea_content
+            )
+            # Query and add without awaiting in between, so two similar ideas
+            # finishing together can't both miss each other
+            similar = None
+            match = self.minhash.query(signature) if self.near_duplicates != "off" else None
+            if match:
+                similar = (self.minhash.name(match[0]), match[1])
+                if self.near_duplicates == "skip":
+                    if source is not None:
+                        os.remove(source)
+                    return "similar"
+                self._near_duplicates += 1
+                self.status.log(f"Idea {i+1} looks like {similar[0]} (similarity {similar[1]:.2f})")
+            self._minhash_pending[(run_id, i)] = (self.minhash.add(signature), similar)
+
+        if self.embeddings is not None:
+            vector = await self._embed_idea(client, i, idea_content)
+            if vector is not None:
+                self._embed_pending[(run_id, i)] = vector
+
+        # Structured ideas come with their title; otherwise extract one from the content
+        if fields is not None and fields["title"]:
+            idea_title = fields["title"].splitlines()[0][:50]
+        else:
+            idea_title = self._extract_title(idea_content)
+        sanitized_title = self._sanitize_filename(idea_title)
+
+        # When streaming a single idea the tokens are already on disk (source),
+        # so the writer only has to give the partial file its name
+        metadata = {"run": run_id, "slot": i, "model": self.model}
+        if fields is not None:
+            metadata.update(title=fields["title"], tags=fields["tags"])
+        if options:
+            metadata["options"] = options
+        await self.writer.submit(sanitized_title, idea_content, source, (run_id, i, options), metadata)
+        return "saved"
+
+    async def _embed_idea(self, client, i, content):
+        """Embed one idea; failures are logged, not retried, since the idea
+        itself is fine and ideation.py embed can fill the gap later"""
+        host = self.host_pool.acquire()
+        try:
+            vectors = await embed_async(client, host.url, self.embed_model, [content])
+            return vectors[0]
+        except RETRYABLE_ERRORS + (KeyError, IndexError) as e:
+            self.status.log(f"Embedding Error (idea {i+1}): {str(e)}", error=True)
+            return None
+        finally:
+            # Embedding calls don't count towards the host's health or latency
+            self.host_pool.cancel(host)
+
+    def _on_idea_saved(self, context, filename, filepath, content):
+        """Writer thread callback once an idea is on disk under its name"""
+        run_id, i = context[:2]
+        self.journal.record_done(run_id, i, filename)
+        # Indexes need unique names; titles in a packed store can repeat
+        name = filename if self.output_format == "md" else record_name({"name": filename, "run": run_id, "slot": i})
+        if self.content_index is not None:
+            self.content_index.record(content_hash(content))
+        if (run_id, i) in self._embed_pending:
+            vector = self._embed_pending.pop((run_id, i))
+            try:
+                self.embeddings.append(name, vector)
+            except (OSError, ValueError) as e:
+                self.status.log(f"Embedding Error (idea {i+1}): {str(e)}", error=True)
+        if (run_id, i) in self._minhash_pending:
+            idea_id, similar = self._minhash_pending.pop((run_id, i))
+            self.minhash.record(idea_id, name)
+            if similar:
+                append_near_duplicate(self.output_folder, {
+                    "file": name, "similar_to": similar[0], "similarity": round(similar[1], 3),
+                })
+        self._saved += 1
+        self.status.saved(filename)
+        if self.output_format == "md":
+            self.status.log(f"Saved idea to: {filepath}")
+        else:
+            self.status.log(f"Saved idea {filename} to: {filepath}")
+
+    def _on_write_error(self, context, error):
+        """Writer thread callback when an idea could not be written"""
+        if context is None:
+            self.status.log(f"Write Error ({MANIFEST_FILENAME}): {str(error)}", error=True)
+            return
+        run_id, i, options = context
+        self.status.log(f"Write Error (idea {i+1}): {str(error)}", error=True)
+        # The slot was counted as done when it was handed over; dead-letter
+        # it so "Retry Failed" generates it again
+        prompt = self._retry_entries.get(dead_letter_key(run_id, i), {}).get("prompt", self.prompt_template)
+        entry = self._dead_letter_entry(run_id, i, prompt, error, 1, options)
+        self.dead_letters[dead_letter_key(run_id, i)] = entry
+        self._failed += 1
+        try:
+            append_dead_letter(self.output_folder, entry)
+        except OSError:
+            pass  # still written by save_dead_letters at the end of the run
+
+    async def _stream_idea(self, client, url, i, prompt, partial_path):
+        """Consume Ollama's NDJSON stream, writing tokens to disk as they arrive"""
+        started = time.monotonic()
+        chunks = []
+        result = {}
+        async with client.stream("POST", url, json=prompt) as response:
+            response.raise_for_status()
+            with open(partial_path, 'w') as f:
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise OllamaError(chunk["error"])
+
+                    token = chunk.get("response", "")
+                    if token:
+                        if not chunks:
+                            self.status.first_token(i, time.monotonic() - started)
+                        chunks.append(token)
+                        f.write(token)
+                        f.flush()
+                        self.status.token(i, token)
+
+                    if chunk.get("done"):
+                        result = chunk
+                        break
+        return "".join(chunks), result
+
+    def stop(self):
+        """Stop the ideation process without blocking the caller.
+
+        In-flight requests are cancelled on the engine's event loop; ideas
+        already handed to the writer are still saved before run() returns.
+        """
+        self.is_running = False
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._cancel_batch)
+        except RuntimeError:
+            # The loop has already finished
+            pass
+
+    def _cancel_batch(self):
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+
+    def _extract_title(self, content):
+        """Extract a title from the idea content"""
+        # Try to find a heading
+        heading_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+        if heading_match:
+            return heading_match.group(1).strip()[:50]
+        
+        # Otherwise take the first line
+        first_line = content.strip().split('\n')[0]
+        return first_line[:50]
+
+    def _sanitize_filename(self, filename):
+        """Sanitize the filename to be valid"""
+        # Remove invalid characters
+        sanitized = re.sub(r'[<>:"/\\|?*]', '', filename)
+        # Replace spaces with underscores
+        sanitized = sanitized.replace(' ', '_')
+        # Ensure it's not empty
+        if not sanitized:
+            sanitized = f"idea_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return sanitized
@@ -0,0 +1,140 @@
+"""
+Sampling options and parameter sweeps for Ollama Ideation.
+
+Each sampling parameter is either one value or a LOW:HIGH[:STEPS] range,
+and a sweep strategy decides which value of each range a slot is generated
+with: spread evenly over the batch (linear), cycled through every
+combination of STEPS points (grid), or drawn at random. With a seed every
+slot's options, seed included, are the same on every run.
+"""
+import random
+import itertools
+from dataclasses import dataclass
+
+# Ollama options that can be set or swept, and the type Ollama expects
+SAMPLING_PARAMETERS = {
+    "temperature": float,
+    "top_p": float,
+    "top_k": int,
+    "repeat_penalty": float,
+}
+SWEEP_STRATEGIES = ("linear", "grid", "random")
+DEFAULT_GRID_STEPS = 3
+
+
+@dataclass
+class ParameterRange:
+    """One sampling parameter: a fixed value when low == high"""
+    low: float
+    high: float
+    steps: int = DEFAULT_GRID_STEPS
+
+    @property
+    def fixed(self):
+        return self.low == self.high
+
+    def at(self, position):
+        """Value at a position between 0 (low) and 1 (high)"""
+        return self.low + (self.high - self.low) * min(max(position, 0.0), 1.0)
+
+    def points(self):
+        if self.fixed or self.steps < 2:
+            return [self.low]
+        return [self.at(step / (self.steps - 1)) for step in range(self.steps)]
+
+
+def parse_range(text, integer=False):
+    """Parse "VALUE" or "LOW:HIGH[:STEPS]" into a ParameterRange"""
+    convert = int if integer else float
+    parts = str(text).strip().split(":")
+    if len(parts) not in (1, 2, 3) or not all(part.strip() for part in parts):
+        raise ValueError(f"Expected VALUE or LOW:HIGH[:STEPS], got {text!r}")
+    low = convert(parts[0])
+    high = convert(parts[1]) if len(parts) > 1 else low
+    steps = int(parts[2]) if len(parts) > 2 else DEFAULT_GRID_STEPS
+    if high < low or steps < 1:
+        raise ValueError(f"Bad range {text!r}: LOW must not exceed HIGH and STEPS must be positive")
+    return ParameterRange(low, high, steps)
+
+
+class SamplingSweep:
+    """Ollama options for every slot of a batch.
+
+    parameters maps names from SAMPLING_PARAMETERS to values or range
+    strings. seed is None, a base seed, or a "START:END" range that slot
+    seeds wrap around in. With per_request ideas in each request, only every
+    per_request-th slot starts one, so ranges are swept by request instead
+    of by slot.
+    """
+
+    def __init__(self, parameters=None, strategy="linear", batch_size=1, seed=None, per_request=1):
+        if strategy not in SWEEP_STRATEGIES:
+            raise ValueError(f"Unknown sweep strategy: {strategy}")
+        self.strategy = strategy
+        self.batch_size = max(1, batch_size)
+        self.per_request = max(1, per_request)
+        self.requests = -(-self.batch_size // self.per_request)
+        self.ranges = {}
+        for name, value in (parameters or {}).items():
+            if value is None or value == "":
+                continue
+            if name not in SAMPLING_PARAMETERS:
+                raise ValueError(f"Unknown sampling parameter: {name}")
+            self.ranges[name] = parse_range(value, SAMPLING_PARAMETERS[name] is int)
+        self.seed_range = parse_range(seed, integer=True) if seed is not None else None
+        swept = [name for name, parameter in self.ranges.items() if not parameter.fixed]
+        self._grid = list(itertools.product(*(self.ranges[name].points() for name in swept)))
+        self._swept = swept
+
+    @property
+    def seeded(self):
+        return self.seed_range is not None
+
+    def describe(self):
+        """One line summary for the log"""
+        parts = []
+        for name, parameter in self.ranges.items():
+            parts.append(f"{name}={parameter.low:g}" if parameter.fixed
+                         else f"{name}={parameter.low:g}..{parameter.high:g}")
+        if self._swept:
+            parts.append(f"{self.strategy} sweep")
+        if self.seeded:
+            parts.append(f"seeds from {self.seed_range.low:g}" if self.seed_range.fixed
+                         else f"seeds {self.seed_range.low:g}..{self.seed_range.high:g}")
+        return ", ".join(parts)
+
+    def seed(self, slot, rounds=0):
+        """Seed for a slot; each further round of a slot moves a batch size on"""
+        offset = slot + rounds * self.batch_size
+        start, end = int(self.seed_range.low), int(self.seed_range.high)
+        if start == end:
+            return start + offset
+        return start + offset % (end - start + 1)
+
+    def values(self, slot, rounds=0):
+        """Sampling parameter values for a request starting at slot"""
+        values = {name: parameter.low for name, parameter in self.ranges.items() if parameter.fixed}
+        if not self._swept:
+            return values
+        request = slot // self.per_request
+        if self.strategy == "linear":
+            position = request / (self.requests - 1) if self.requests > 1 else 0.0
+            for name in self._swept:
+                values[name] = self.ranges[name].at(position)
+        elif self.strategy == "grid":
+            values.update(zip(self._swept, self._grid[request % len(self._grid)]))
+        else:
+            # Reproducible draws when seeded; fresh ones on every round
+            rng = random.Random(f"{self.seed_range.low:g}:{slot}:{rounds}") if self.seeded else random.Random()
+            for name in self._swept:
+                values[name] = rng.uniform(self.ranges[name].low, self.ranges[name].high)
+        return values
+
+    def options(self, slot, rounds=0):
+        """The "options" object of a request for a slot"""
+        options = {}
+        for name, value in self.values(slot, rounds).items():
+            options[name] = int(round(value)) if SAMPLING_PARAMETERS[name] is int else round(value, 4)
+        if self.seeded:
+            options["seed"] = self.seed(slot, rounds)
+        return options
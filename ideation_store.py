@@ -0,0 +1,229 @@
+"""
+Packed output stores for Ollama Ideation.
+
+Instead of one markdown file per idea, a batch can be appended to a single
+JSONL file (optionally zstd-compressed) or a SQLite database in the output
+folder. Each record holds the idea's run id, slot, name, content, model and
+creation time, plus title and tags for structured ideas and the sampling
+options the idea was generated with; ideation_engine.export_markdown()
+turns a store back into .md files.
+"""
+import os
+import json
+import sqlite3
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for the jsonl.zst format
+    zstandard = None
+
+# Output formats: one markdown file per idea, or one of the packed stores
+OUTPUT_FORMATS = ("md", "jsonl", "jsonl.zst", "sqlite")
+STORE_FILENAMES = {
+    "jsonl": "ideas.jsonl",
+    "jsonl.zst": "ideas.jsonl.zst",
+    "sqlite": "ideas.sqlite",
+}
+ZSTD_LEVEL = 10
+# Cluster index written next to the ideas (see ideation_embed); not an idea
+CLUSTERS_FILENAME = "clusters.md"
+
+
+def store_path(output_folder, output_format):
+    return os.path.join(output_folder, STORE_FILENAMES[output_format])
+
+
+def find_stores(output_folder):
+    """Packed stores present in a folder, as (format, path) pairs"""
+    stores = []
+    for output_format, filename in STORE_FILENAMES.items():
+        path = os.path.join(output_folder, filename)
+        if os.path.exists(path):
+            stores.append((output_format, path))
+    return stores
+
+
+def format_for_path(path):
+    for output_format, filename in STORE_FILENAMES.items():
+        if path.endswith("." + output_format) or os.path.basename(path) == filename:
+            return output_format
+    if path.endswith(".db"):
+        return "sqlite"
+    raise ValueError(f"Unknown store format: {path}")
+
+
+class JsonlStore:
+    """Append-only JSON lines, one record per idea.
+
+    With compress=True every appended batch becomes its own zstd frame, so
+    the file is still append-only and a torn final frame only loses the
+    batch that was being written.
+    """
+
+    def __init__(self, path, compress=False):
+        if compress and zstandard is None:
+            raise RuntimeError("The jsonl.zst format needs the zstandard package (pip install zstandard)")
+        self.path = path
+        self.compress = compress
+        self._file = None
+
+    def append(self, records, sync=False):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        if self.compress:
+            data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        self._file.write(data)
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __iter__(self):
+        if not os.path.exists(self.path):
+            return
+        if self.compress:
+            lines = self._read_compressed().split(b"\n")
+        else:
+            with open(self.path, 'rb') as f:
+                lines = f.read().split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Torn last line from a crash
+                continue
+
+    def _read_compressed(self):
+        if zstandard is None:
+            raise RuntimeError("Reading jsonl.zst needs the zstandard package (pip install zstandard)")
+        chunks = []
+        with open(self.path, 'rb') as f:
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            try:
+                while True:
+                    chunk = reader.read(1 << 20)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+            except zstandard.ZstdError:
+                # Torn final frame from a crash
+                pass
+        return b"".join(chunks)
+
+
+class SqliteStore:
+    """Ideas in one SQLite table, committed once per written batch"""
+    # title and tags are only set for structured ideas and options for
+    # ideas with sampling options; tags and options are stored as JSON
+    COLUMNS = ("run", "slot", "name", "content", "model", "created", "title", "tags", "options")
+    JSON_COLUMNS = ("tags", "options")
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            # Only the writer thread uses the connection once it is open
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ideas ("
+                "id INTEGER PRIMARY KEY, run TEXT, slot INTEGER, name TEXT, "
+                "content TEXT, model TEXT, created TEXT, title TEXT, tags TEXT, options TEXT)"
+            )
+            # Stores from before structured output lack the newer columns
+            existing = {row[1] for row in self._db.execute("PRAGMA table_info(ideas)")}
+            for column in ("title", "tags", "options"):
+                if column not in existing:
+                    self._db.execute(f"ALTER TABLE ideas ADD COLUMN {column} TEXT")
+        return self._db
+
+    def append(self, records, sync=False):
+        db = self._connect()
+        db.execute(f"PRAGMA synchronous={'FULL' if sync else 'NORMAL'}")
+        rows = []
+        for record in records:
+            rows.append([
+                json.dumps(record[column]) if column in self.JSON_COLUMNS and record.get(column) is not None
+                else record.get(column)
+                for column in self.COLUMNS
+            ])
+        with db:
+            db.executemany(
+                f"INSERT INTO ideas ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                rows,
+            )
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __iter__(self):
+        if not os.path.exists(self.path):
+            return
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        try:
+            columns = [row[1] for row in db.execute("PRAGMA table_info(ideas)") if row[1] in self.COLUMNS]
+            for row in db.execute(f"SELECT {', '.join(columns)} FROM ideas ORDER BY id"):
+                record = {key: value for key, value in dict(row).items() if value is not None}
+                for column in self.JSON_COLUMNS:
+                    if column in record:
+                        record[column] = json.loads(record[column])
+                yield record
+        finally:
+            db.close()
+
+
+def record_name(record):
+    """Unique name of a packed-store idea; titles alone repeat"""
+    if "run" in record and "slot" in record:
+        return f"{record['name']} [{record['run']}#{record['slot']}]"
+    return record["name"]
+
+
+def iter_saved_ideas(output_folder):
+    """Yield (name, content) for every idea in a folder, files and stores alike.
+
+    Files are named by their path in the folder, store records by record_name().
+    """
+    for root, dirs, files in os.walk(output_folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith(".md") and not name.startswith('.'):
+                path = os.path.join(root, name)
+                if path == os.path.join(output_folder, CLUSTERS_FILENAME):
+                    continue
+                try:
+                    with open(path) as f:
+                        content = f.read()
+                except (OSError, UnicodeDecodeError):
+                    continue
+                yield os.path.relpath(path, output_folder).replace(os.sep, "/"), content
+    for output_format, path in find_stores(output_folder):
+        try:
+            for record in open_store(path, output_format):
+                yield record_name(record), record["content"]
+        except (OSError, RuntimeError, sqlite3.Error):
+            # e.g. jsonl.zst without zstandard installed
+            continue
+
+
+def open_store(path, output_format=None):
+    """Open the packed store at path for appending or reading"""
+    output_format = output_format or format_for_path(path)
+    if output_format == "sqlite":
+        return SqliteStore(path)
+    if output_format in ("jsonl", "jsonl.zst"):
+        return JsonlStore(path, compress=output_format == "jsonl.zst")
+    raise ValueError(f"Not a packed output format: {output_format}")
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ideation_cache import ResponseCache, cache_key, is_deterministic
+
+
+def test_key_ignores_transport_fields():
+    payload = {"model": "m", "prompt": "p", "options": {"seed": 1}}
+    assert cache_key(payload) == cache_key(dict(payload, stream=True, keep_alive="5m"))
+    assert cache_key(payload) != cache_key(dict(payload, options={"seed": 2}))
+    assert is_deterministic(payload)
+    assert not is_deterministic({"model": "m", "options": {"temperature": 0.7}})
+
+
+def test_put_and_get_count_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1000)
+    assert cache.get("a") is None
+    cache.put("a", "answer")
+    assert cache.get("a") == "answer"
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    for key in "abc":
+        cache.put(key, key * 10)
+        time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.get("b") == "b" * 10 and cache.get("c") == "c" * 10
+    assert cache.total_bytes == 20
+    cache.close()
+
+
+def test_get_refreshes_recency(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    cache.put("a", "a" * 10)
+    time.sleep(0.01)
+    cache.put("b", "b" * 10)
+    time.sleep(0.01)
+    assert cache.get("a") == "a" * 10
+    time.sleep(0.01)
+    cache.put("c", "c" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+    cache.close()
+
+
+def test_size_survives_reopening(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", "a" * 10)
+    cache.put("a", "a" * 30)
+    cache.close()
+    reopened = ResponseCache(str(tmp_path), max_bytes=1000)
+    assert reopened.total_bytes == 30
+    reopened.close()
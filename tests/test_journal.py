@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ideation_engine import JOURNAL_FILENAME, ContentIndex, JobJournal, content_hash
+
+
+def write_journal(folder):
+    journal = JobJournal(str(folder))
+    journal.start_job("run1", "prompt", 3, "model")
+    journal.record_done("run1", 0, "a.md")
+    journal.end_job("run1")
+    journal.start_job("run2", "prompt", 3, "model")
+    journal.record_done("run2", 1, "b.md")
+    journal.close()
+
+
+def test_finds_unfinished_job_not_ended_one(tmp_path):
+    write_journal(tmp_path)
+    job = JobJournal(str(tmp_path)).load().find_resumable("prompt", 3, "model")
+    assert job["run"] == "run2"
+    assert job["done"] == {1}
+
+
+def test_no_resumable_job_for_other_prompt_size_or_model(tmp_path):
+    write_journal(tmp_path)
+    journal = JobJournal(str(tmp_path)).load()
+    assert journal.find_resumable("other", 3, "model") is None
+    assert journal.find_resumable("prompt", 4, "model") is None
+    assert journal.find_resumable("prompt", 3, "other") is None
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    write_journal(tmp_path)
+    with open(tmp_path / JOURNAL_FILENAME, 'a') as f:
+        f.write('{"type": "end", "ru')
+    journal = JobJournal(str(tmp_path)).load()
+    assert journal.jobs["run1"]["ended"]
+    assert journal.find_resumable("prompt", 3, "model")["run"] == "run2"
+
+
+def test_resumed_job_ends(tmp_path):
+    write_journal(tmp_path)
+    journal = JobJournal(str(tmp_path)).load()
+    journal.record_done("run2", 0, "c.md")
+    journal.end_job("run2")
+    journal.close()
+    assert JobJournal(str(tmp_path)).load().find_resumable("prompt", 3, "model") is None
+
+
+def test_content_index_claims_each_hash_once(tmp_path):
+    index = ContentIndex(str(tmp_path)).load()
+    digest = content_hash("# Idea\n\nSome   body")
+    assert content_hash("# idea some body") == digest
+    assert index.claim(digest)
+    assert not index.claim(digest)
+    index.record(digest)
+    index.close()
+    assert not ContentIndex(str(tmp_path)).load().claim(digest)
+
+
+def test_content_index_built_from_existing_ideas(tmp_path):
+    (tmp_path / "idea.md").write_text("# Old idea\n\nbody\n")
+    index = ContentIndex(str(tmp_path)).load()
+    assert not index.claim(content_hash("# Old idea\n\nbody\n"))
+    assert index.claim(content_hash("# New idea"))
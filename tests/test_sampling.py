@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ideation_sampling import SamplingSweep, parse_range
+
+
+def test_parse_range():
+    assert parse_range("0.7").fixed
+    assert parse_range("1:40:4", integer=True).points() == [1, 14, 27, 40]
+    with pytest.raises(ValueError):
+        parse_range("1.2:0.5")
+
+
+def test_linear_spreads_over_batch():
+    sweep = SamplingSweep({"temperature": "0.5:1.5"}, "linear", batch_size=5)
+    assert [sweep.options(slot)["temperature"] for slot in range(5)] == [0.5, 0.75, 1.0, 1.25, 1.5]
+
+
+def test_grid_cycles_through_combinations():
+    sweep = SamplingSweep({"temperature": "0.5:1.0:2", "top_k": "10:20:2"}, "grid", batch_size=6)
+    combos = [(sweep.options(slot)["temperature"], sweep.options(slot)["top_k"]) for slot in range(6)]
+    assert combos[:4] == [(0.5, 10), (0.5, 20), (1.0, 10), (1.0, 20)]
+    assert combos[4:] == combos[:2]
+
+
+def test_random_is_reproducible_when_seeded():
+    first = SamplingSweep({"temperature": "0.1:2.0", "top_p": "0.5:1.0"}, "random", batch_size=4, seed="7")
+    second = SamplingSweep({"temperature": "0.1:2.0", "top_p": "0.5:1.0"}, "random", batch_size=4, seed="7")
+    options = [first.options(slot) for slot in range(4)]
+    assert options == [second.options(slot) for slot in range(4)]
+    assert all(0.1 <= o["temperature"] <= 2.0 and 0.5 <= o["top_p"] <= 1.0 for o in options)
+    assert first.options(0, rounds=1) != options[0]
+
+
+def test_seed_moves_on_per_round_and_wraps_in_range():
+    sweep = SamplingSweep(batch_size=4, seed="100")
+    assert [sweep.options(slot)["seed"] for slot in range(4)] == [100, 101, 102, 103]
+    assert sweep.options(1, rounds=2)["seed"] == 109
+    wrapped = SamplingSweep(batch_size=4, seed="10:12")
+    assert [wrapped.seed(slot) for slot in range(4)] == [10, 11, 12, 10]
+    assert wrapped.seed(0, rounds=1) == 11
+
+
+def test_unseeded_options_have_no_seed():
+    assert "seed" not in SamplingSweep({"temperature": "0.8"}).options(0)
+
+
+def test_sweep_by_request_with_several_ideas_per_request():
+    sweep = SamplingSweep({"temperature": "0.6:1.2:3"}, "grid", batch_size=9, per_request=3)
+    assert [sweep.options(slot)["temperature"] for slot in (0, 3, 6)] == [0.6, 0.9, 1.2]
+    linear = SamplingSweep({"temperature": "0.5:1.5"}, "linear", batch_size=6, per_request=2)
+    assert [linear.options(slot)["temperature"] for slot in (0, 2, 4)] == [0.5, 1.0, 1.5]
+    assert linear.options(1)["temperature"] == 0.5
+
+
+def test_unknown_parameter_or_strategy():
+    with pytest.raises(ValueError):
+        SamplingSweep({"mirostat": "1"})
+    with pytest.raises(ValueError):
+        SamplingSweep(strategy="spiral")
@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ideation_engine import IDEA_DELIMITER, split_ideas
+
+
+def test_json_list_keeps_short_first_idea():
+    text = '{"ideas": ["A bike sharing app for kids", "A recipe app"]}'
+    assert split_ideas(text, 2, "json") == ["A bike sharing app for kids", "A recipe app"]
+
+
+def test_delimiter_keeps_short_first_idea():
+    text = f"Short idea one\n{IDEA_DELIMITER}\nShort idea two"
+    assert split_ideas(text, 2) == ["Short idea one", "Short idea two"]
+
+
+def test_heading_split_drops_preamble():
+    text = "Here are 2 ideas:\n\n# First\nbody one\n\n# Second\nbody two"
+    assert split_ideas(text, 2) == ["# First\nbody one", "# Second\nbody two"]
+
+
+def test_more_headings_than_ideas_stays_whole():
+    text = "# Idea\n\n# Target market\nx\n\n# Obstacles\ny"
+    assert split_ideas(text, 2) == [text]
+
+
+def test_json_objects_become_markdown():
+    text = '[{"title": "One", "body": "b1"}, {"title": "Two", "body": "b2"}]'
+    assert split_ideas(text, 2, "json") == ["# One\n\nb1", "# Two\n\nb2"]
+
+
+def test_unsplittable_text_is_one_idea():
+    assert split_ideas("just one idea", 3) == ["just one idea"]
+
+
+def test_empty_json_list_gives_no_ideas():
+    assert split_ideas('{"ideas": []}', 2, "json") == []